@@ -0,0 +1,115 @@
+"""
+NumPy 批次牌力評估
+
+輸入 (N, 5)~(N, 7) 的卡牌編碼陣列(編碼方式同 PokerEvaluator)，
+以陣列運算一次算出 N 組牌的牌力與牌型階級(對應 CardTypeStageEnum)
+"""
+from math import comb
+
+import numpy as np
+
+from PokerCombination import unrank_combinations
+from PokerEvaluator import STAGE_SHIFT, STAGE_FOUR_KIND, STAGE_FULL_HOUSE, STAGE_STRAIGHT, STAGE_THREE_KIND, \
+    STAGE_TWO_PAIR, STAGE_ONE_PAIR, STAGE_HIGH_CARD, STRAIGHT_HIGH_TABLE, FLUSH_BEST_TABLE, evaluate5
+
+# 點數位元遮罩 => 順子最大點數
+_STRAIGHT_HIGH = np.array(STRAIGHT_HIGH_TABLE, dtype=np.int32)
+# 點數位元遮罩 => 最大點數索引(空遮罩為-1)
+_TOP_RANK_INDEX = np.array([rank_mask.bit_length() - 1 for rank_mask in range(8192)], dtype=np.int32)
+# 點數位元遮罩 => 該花色的同花/同花順牌力(不足五張為0)
+_FLUSH_STRENGTH = np.array(FLUSH_BEST_TABLE, dtype=np.int32)
+_NIBBLE_SHIFTS = np.array([16, 12, 8, 4, 0], dtype=np.int32)
+
+
+def evaluate_batch(cards) -> (np.ndarray, np.ndarray):
+    """
+    批次評估牌力
+    :param cards: (N, 5)~(N, 7) 卡牌編碼陣列
+    :return: 牌力 (N,) int32, 牌型階級 (N,) int32
+    """
+    cards = np.asarray(cards, dtype=np.int32)
+    if cards.ndim != 2 or not 5 <= cards.shape[1] <= 7:
+        raise ValueError(f'陣列形狀必須為 (N, 5)~(N, 7)，目前為{cards.shape}')
+    total = cards.shape[0]
+    rows = np.arange(total, dtype=np.int64)[:, None]
+    ranks = cards >> 2
+    suits = cards & 3
+
+    # 點數分佈、花色分佈與點數位元遮罩
+    rank_counts = np.bincount((rows * 13 + ranks).ravel(), minlength=total * 13).reshape(total, 13)
+    suit_counts = np.bincount((rows * 4 + suits).ravel(), minlength=total * 4).reshape(total, 4)
+    rank_bits = np.left_shift(1, ranks)
+    rank_mask = np.bitwise_or.reduce(rank_bits, axis=1)
+
+    # 依(數量, 點數)由大到小排序，取前五組
+    group_keys = np.where(rank_counts > 0, rank_counts * 16 + np.arange(13), -1)
+    group_keys = np.sort(group_keys, axis=1)[:, :-6:-1]
+    group_counts = group_keys >> 4
+    group_ranks = np.where(group_keys >= 0, (group_keys & 15) + 2, 0)
+    first_rank_bits = np.left_shift(1, group_ranks[:, 0] - 2)
+    second_rank_bits = np.left_shift(1, np.maximum(group_ranks[:, 1] - 2, 0))
+
+    straight_high = _STRAIGHT_HIGH[rank_mask]
+    is_quads = group_counts[:, 0] == 4
+    is_full_house = (group_counts[:, 0] == 3) & (group_counts[:, 1] >= 2)
+    is_straight = straight_high > 0
+    is_trips = group_counts[:, 0] == 3
+    is_two_pair = (group_counts[:, 0] == 2) & (group_counts[:, 1] == 2)
+    is_pair = group_counts[:, 0] == 2
+    stage = np.select(
+        [is_quads, is_full_house, is_straight, is_trips, is_two_pair, is_pair],
+        [STAGE_FOUR_KIND, STAGE_FULL_HOUSE, STAGE_STRAIGHT, STAGE_THREE_KIND, STAGE_TWO_PAIR, STAGE_ONE_PAIR],
+        STAGE_HIGH_CARD,
+    ).astype(np.int32)
+
+    # 依牌型整理比較點數
+    nibbles = group_ranks.copy()
+    quads = stage == STAGE_FOUR_KIND
+    nibbles[quads, 1] = _TOP_RANK_INDEX[rank_mask[quads] & ~first_rank_bits[quads]] + 2
+    nibbles[quads, 2:] = 0
+    nibbles[stage == STAGE_FULL_HOUSE, 2:] = 0
+    straight = stage == STAGE_STRAIGHT
+    nibbles[straight, 0] = straight_high[straight]
+    nibbles[straight, 1:] = 0
+    nibbles[stage == STAGE_THREE_KIND, 3:] = 0
+    two_pair = stage == STAGE_TWO_PAIR
+    nibbles[two_pair, 2] = _TOP_RANK_INDEX[rank_mask[two_pair] & ~(first_rank_bits | second_rank_bits)[two_pair]] + 2
+    nibbles[two_pair, 3:] = 0
+    nibbles[stage == STAGE_ONE_PAIR, 4:] = 0
+    strength = (stage << STAGE_SHIFT) | np.bitwise_or.reduce(nibbles << _NIBBLE_SHIFTS, axis=1)
+
+    # 同花/同花順(七張以內不會與鐵支、葫蘆同時成立)
+    flush_suit = np.argmax(suit_counts, axis=1)
+    is_flush = suit_counts[np.arange(total), flush_suit] >= 5
+    if is_flush.any():
+        flush_bits = np.where(suits[is_flush] == flush_suit[is_flush, None], rank_bits[is_flush], 0)
+        strength[is_flush] = _FLUSH_STRENGTH[np.bitwise_or.reduce(flush_bits, axis=1)]
+    return strength.astype(np.int32), (strength >> STAGE_SHIFT).astype(np.int32)
+
+
+def all_five_card_hands() -> np.ndarray:
+    """
+    全部 C(52,5) 組五張牌(依組合索引順序)
+    :return: (2598960, 5) int8
+    """
+    return unrank_combinations(np.arange(comb(52, 5)), 5)
+
+
+def verify_all_five_card_hands(batch_size=200000) -> int:
+    """
+    以全部五張組合比對批次評估與單筆評估結果
+    :param batch_size: 每批數量
+    :return: 不一致的數量
+    """
+    hands = all_five_card_hands()
+    mismatch = 0
+    for start in range(0, len(hands), batch_size):
+        chunk = hands[start:start + batch_size]
+        strength, _ = evaluate_batch(chunk)
+        expected = np.array([evaluate5(*hand) for hand in chunk.tolist()], dtype=np.int32)
+        mismatch += int(np.count_nonzero(strength != expected))
+    return mismatch
+
+
+if __name__ == '__main__':
+    print('不一致數量:', verify_all_five_card_hands())
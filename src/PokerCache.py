@@ -0,0 +1,114 @@
+"""
+牌力評估快取
+
+以 52 位元卡牌遮罩為鍵的 LRU 快取，並可預先計算全部 C(52,5) 組五張牌的牌力存入緊湊陣列
+"""
+from array import array
+from collections import OrderedDict
+
+from PokerCombination import combination_count, iter_combinations, rank_combination, shard_ranges
+from PokerEvaluator import evaluate, evaluate5
+from PokerSharedTables import shared_process_pool
+
+FIVE_CARD_HAND_NUM = combination_count(5)
+
+
+def five_card_index(codes) -> int:
+    """
+    五張牌的組合索引(colex 順序，0 ~ 2598959)
+    :param codes: 五張卡牌編碼
+    :return: int
+    """
+    return rank_combination(codes)
+
+
+def _five_card_shard(start: int, stop: int) -> array:
+    """
+    計算組合索引 start ~ stop-1 的五張牌力(於工作行程內執行)
+    """
+    return array('i', [evaluate5(*codes) for codes in iter_combinations(5, start, stop)])
+
+
+def build_five_card_table(workers=1) -> array:
+    """
+    依組合索引順序計算全部五張組合的牌力
+    :param workers: 工作行程數，大於1時依組合索引平均切分給行程池
+    :return: array('i')，長度 2598960
+    """
+    if workers <= 1:
+        return _five_card_shard(0, FIVE_CARD_HAND_NUM)
+    starts, stops = zip(*shard_ranges(FIVE_CARD_HAND_NUM, workers))
+    table = array('i')
+    # 工作行程共用查表
+    with shared_process_pool(max_workers=workers) as executor:
+        for shard in executor.map(_five_card_shard, starts, stops):
+            table.extend(shard)
+    return table
+
+
+class EvaluationCache:
+    """
+    牌力評估快取
+    :param maxsize: LRU 最多保留的筆數
+    """
+
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._five_card_table = None
+
+    def evaluate(self, codes) -> int:
+        """
+        評估牌力(先查快取)
+        :param codes: 卡牌編碼
+        :return: 牌力(int)
+        """
+        if self._five_card_table is not None and len(codes) == 5:
+            self.hits += 1
+            return self._five_card_table[five_card_index(codes)]
+        mask = 0
+        for code in codes:
+            mask |= 1 << code
+        strength = self._entries.get(mask)
+        if strength is not None:
+            self.hits += 1
+            self._entries.move_to_end(mask)
+            return strength
+        self.misses += 1
+        strength = evaluate(codes)
+        self._entries[mask] = strength
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return strength
+
+    def prewarm(self, table=None, workers=1):
+        """
+        預先載入全部五張組合的牌力陣列
+        :param table: 已計算的陣列(預設重新計算)
+        :param workers: 重新計算時的工作行程數
+        :return:
+        """
+        self._five_card_table = table if table is not None else build_five_card_table(workers)
+
+    def clear(self):
+        """
+        清空快取與計數(保留預先載入的五張陣列)
+        :return:
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "prewarmed": self._five_card_table is not None,
+        }
@@ -0,0 +1,137 @@
+"""
+組合數系統(combinatorial number system)索引
+
+任意 k 張牌(卡牌編碼 0~51)的集合對應到 0 ~ C(52,k)-1 的唯一整數(colex 順序):
+    index = C(c0, 1) + C(c1, 2) + ... + C(c(k-1), k)，其中 c0 < c1 < ... < c(k-1)
+可作為預先計算表的位址、不建立 PokerGroup 的均勻隨機抽牌，以及將窮舉平均切分給多個行程
+"""
+import random
+from bisect import bisect_right
+from math import comb
+
+CARD_NUM = 52
+# 二項式係數表 BINOMIAL[n][k]
+BINOMIAL = tuple(tuple(comb(n, k) for k in range(CARD_NUM + 1)) for n in range(CARD_NUM + 1))
+# 各 k 值的係數欄 BINOMIAL[0~52][k]，供二分搜尋
+_BINOMIAL_COLUMNS = tuple(tuple(BINOMIAL[n][k] for n in range(CARD_NUM + 1)) for k in range(CARD_NUM + 1))
+
+
+def combination_count(k: int, n=CARD_NUM) -> int:
+    """
+    C(n, k)
+    """
+    return BINOMIAL[n][k]
+
+
+def rank_combination(codes) -> int:
+    """
+    卡牌集合 => 組合索引
+    :param codes: 不重複的卡牌編碼
+    :return: int
+    """
+    index = 0
+    for position, code in enumerate(sorted(codes), 1):
+        index += BINOMIAL[code][position]
+    return index
+
+
+def unrank_combination(index: int, k: int) -> list:
+    """
+    組合索引 => 卡牌集合
+    :param index: 組合索引
+    :param k: 張數
+    :return: 由小到大的卡牌編碼
+    """
+    codes = [0] * k
+    for position in range(k, 0, -1):
+        # 最大的 c 使 C(c, position) <= index
+        code = bisect_right(_BINOMIAL_COLUMNS[position], index) - 1
+        codes[position - 1] = code
+        index -= BINOMIAL[code][position]
+    return codes
+
+
+def iter_combinations(k: int, start=0, stop=None, n=CARD_NUM):
+    """
+    依 colex 順序列舉索引 start ~ stop-1 的組合(只在開頭 unrank 一次，其後逐一遞增)
+    :param k: 張數
+    :param start: 起始索引
+    :param stop: 結束索引(不含，預設為 C(n,k))
+    :param n: 牌數
+    :return: tuple 產生器
+    """
+    stop = BINOMIAL[n][k] if stop is None else min(stop, BINOMIAL[n][k])
+    if start >= stop:
+        return
+    codes = unrank_combination(start, k)
+    for _ in range(stop - start):
+        yield tuple(codes)
+        # 找到第一個可以加一的位置，之前的位置重設為最小值
+        position = 0
+        while position < k - 1 and codes[position] + 1 == codes[position + 1]:
+            codes[position] = position
+            position += 1
+        codes[position] += 1
+
+
+def shard_ranges(total: int, shards: int) -> list:
+    """
+    將 0 ~ total-1 平均切成連續區段
+    :param total: 總數
+    :param shards: 分片數
+    :return: [(start, stop), ...]
+    """
+    shards = max(1, min(shards, total))
+    return [(total * index // shards, total * (index + 1) // shards) for index in range(shards)]
+
+
+def random_combination(k: int, rng=None, deck=None) -> list:
+    """
+    均勻隨機抽出 k 張(以一次隨機索引 unrank，不需建立、洗亂牌組)
+    :param k: 張數
+    :param rng: 亂數產生器(需有 randrange 方法，預設為 random 模組)
+    :param deck: 可抽的卡牌編碼(預設為全部52張)
+    :return: [卡牌編碼, ...]
+    """
+    rng = rng or random
+    if deck is None:
+        return unrank_combination(rng.randrange(BINOMIAL[CARD_NUM][k]), k)
+    return [deck[position] for position in unrank_combination(rng.randrange(BINOMIAL[len(deck)][k]), k)]
+
+
+def rank_combinations(cards):
+    """
+    以 NumPy 批次計算組合索引(需安裝 numpy)
+    :param cards: (N, k) 卡牌編碼陣列
+    :return: (N,) int64
+    """
+    import numpy as np
+
+    cards = np.sort(np.asarray(cards, dtype=np.int64), axis=1)
+    table = np.array(BINOMIAL, dtype=np.int64)
+    positions = np.arange(1, cards.shape[1] + 1)
+    return table[cards, positions].sum(axis=1)
+
+
+def unrank_combinations(indexes, k: int):
+    """
+    以 NumPy 批次將組合索引轉回卡牌集合(需安裝 numpy)
+    :param indexes: (N,) 組合索引
+    :param k: 張數
+    :return: (N, k) int8，每列由小到大
+    """
+    import numpy as np
+
+    remaining = np.asarray(indexes, dtype=np.int64).copy()
+    table = np.array(BINOMIAL, dtype=np.int64)
+    cards = np.empty((len(remaining), k), dtype=np.int8)
+    for position in range(k, 0, -1):
+        code = np.searchsorted(table[:, position], remaining, side='right') - 1
+        cards[:, position - 1] = code
+        remaining -= table[code, position]
+    return cards
+
+
+if __name__ == '__main__':
+    for card_num in (2, 3, 5, 7):
+        print(card_num, combination_count(card_num), unrank_combination(combination_count(card_num) - 1, card_num))
@@ -0,0 +1,242 @@
+"""
+德州撲克勝率(equity)計算
+
+以卡牌整數編碼進行模擬，避免每次試驗建立 PokerCard / PokerGroup 物件
+"""
+import os
+import random
+from math import comb, sqrt
+
+from PokerEvaluator import encode_cards, evaluate_best, RANK_COUNT_KEY, RANK_STRENGTH, FLUSH_BEST_TABLE
+from PokerSharedTables import shared_process_pool
+
+# 95% 信賴區間的 z 值
+Z_95 = 1.96
+
+
+def prepare_cards(hands: list, board=None, dead=None) -> (list, list, list):
+    """
+    轉換手牌、顯牌、死牌為卡牌編碼，並計算剩餘牌庫
+    :param hands: [['p1', 'h1'], ['c13', 't13'], ...]
+    :param board: 已出現的顯牌(0~5張)
+    :param dead: 已知不在牌庫中的牌
+    :return: 手牌編碼, 顯牌編碼, 剩餘牌庫編碼
+    """
+    hand_codes = [encode_cards(hand) for hand in hands]
+    board_codes = encode_cards(board or [])
+    dead_codes = encode_cards(dead or [])
+    if len(board_codes) > 5:
+        raise ValueError(f'顯牌最多5張，目前為{len(board_codes)}張')
+    known = [code for hand in hand_codes for code in hand] + board_codes + dead_codes
+    if len(set(known)) != len(known):
+        raise ValueError('手牌、顯牌與死牌之間有重複的牌')
+    known_set = set(known)
+    remaining = [code for code in range(52) if code not in known_set]
+    return hand_codes, board_codes, remaining
+
+
+def holdem_strength(hand_codes: list, board_codes: list) -> int:
+    """
+    德州撲克牌力(手牌與顯牌任取五張)
+    """
+    return evaluate_best(hand_codes + board_codes)[1]
+
+
+def tally_showdown(hand_codes: list, board_codes: list, wins: list, ties: list, shares: list, shares_sq: list,
+                   weight=1, evaluator=holdem_strength):
+    """
+    比牌一次並累計結果
+    :param hand_codes: 各玩家手牌編碼
+    :param board_codes: 完整五張顯牌編碼
+    :param wins: 各玩家獨贏次數(累計)
+    :param ties: 各玩家平手次數(累計)
+    :param shares: 各玩家分得底池比例(累計)
+    :param shares_sq: 各玩家分得底池比例平方(累計，用於信賴區間)
+    :param weight: 此結果的權重(相同結果出現的次數)
+    :param evaluator: evaluator(手牌編碼, 顯牌編碼) -> 牌力，依玩法替換
+    :return:
+    """
+    best = -1
+    winners = []
+    for index, hand in enumerate(hand_codes):
+        strength = evaluator(hand, board_codes)
+        if strength > best:
+            best = strength
+            winners = [index]
+        elif strength == best:
+            winners.append(index)
+    share = 1 / len(winners)
+    for index in winners:
+        if len(winners) == 1:
+            wins[index] += weight
+        else:
+            ties[index] += weight
+        shares[index] += share * weight
+        shares_sq[index] += share * share * weight
+
+
+def _simulate_shard(hand_codes: list, board_codes: list, remaining: list, trials: int, seed: int) -> tuple:
+    """
+    單一分片的模擬(於工作行程內執行)
+    :return: wins, ties, shares, shares_sq
+    """
+    rng = random.Random(seed)
+    player_num = len(hand_codes)
+    wins, ties = [0] * player_num, [0] * player_num
+    shares, shares_sq = [0.0] * player_num, [0.0] * player_num
+    missing = 5 - len(board_codes)
+    sample = rng.sample
+    for _ in range(trials):
+        tally_showdown(hand_codes, board_codes + sample(remaining, missing), wins, ties, shares, shares_sq)
+    return wins, ties, shares, shares_sq
+
+
+def summarize(total: int, wins: list, ties: list, shares: list, shares_sq=None) -> list:
+    """
+    將累計結果整理為各玩家的勝率
+    :param total: 總次數
+    :param shares_sq: 分得底池比例平方(累計)，None 代表為窮舉的精確結果，信賴區間寬度為0
+    :return: [{"win":float, "tie":float, "equity":float, "ci":(float, float)}, ...]
+    """
+    results = []
+    for index in range(len(wins)):
+        equity = shares[index] / total
+        if shares_sq is None:
+            margin = 0.0
+        else:
+            variance = max(shares_sq[index] / total - equity * equity, 0.0)
+            margin = Z_95 * sqrt(variance / total)
+        results.append({
+            "win": wins[index] / total,
+            "tie": ties[index] / total,
+            "equity": equity,
+            "ci": (max(equity - margin, 0.0), min(equity + margin, 1.0)),
+        })
+    return results
+
+
+def monte_carlo_equity(hands: list, board=None, dead=None, trials=100000, workers=None, seed=None) -> list:
+    """
+    蒙地卡羅模擬勝率
+    :param hands: 各玩家手牌 [['p1', 'h1'], ['c13', 't13'], ...]
+    :param board: 已出現的顯牌(0~5張)
+    :param dead: 死牌
+    :param trials: 模擬次數
+    :param workers: 工作行程數(預設為CPU數，1則不開行程池)
+    :param seed: 主亂數種子，各分片種子皆由此衍生
+    :return: [{"win":float, "tie":float, "equity":float, "ci":(float, float)}, ...]
+    """
+    if trials < 1:
+        raise ValueError(f'模擬次數至少為1，目前為{trials}')
+    hand_codes, board_codes, remaining = prepare_cards(hands, board, dead)
+    workers = workers or os.cpu_count() or 1
+    shard_num = min(workers, trials) or 1
+    master = random.Random(seed)
+    shard_trials = [trials // shard_num + (1 if index < trials % shard_num else 0) for index in range(shard_num)]
+    shard_seeds = [master.getrandbits(64) for _ in range(shard_num)]
+
+    if shard_num == 1:
+        shard_results = [_simulate_shard(hand_codes, board_codes, remaining, shard_trials[0], shard_seeds[0])]
+    else:
+        # 工作行程共用查表
+        with shared_process_pool(max_workers=shard_num) as executor:
+            shard_results = list(executor.map(_simulate_shard, [hand_codes] * shard_num, [board_codes] * shard_num,
+                                              [remaining] * shard_num, shard_trials, shard_seeds))
+
+    player_num = len(hand_codes)
+    wins, ties = [0] * player_num, [0] * player_num
+    shares, shares_sq = [0.0] * player_num, [0.0] * player_num
+    for shard_wins, shard_ties, shard_shares, shard_shares_sq in shard_results:
+        for index in range(player_num):
+            wins[index] += shard_wins[index]
+            ties[index] += shard_ties[index]
+            shares[index] += shard_shares[index]
+            shares_sq[index] += shard_shares_sq[index]
+    return summarize(trials, wins, ties, shares, shares_sq)
+
+
+def exhaustive_equity(hands: list, board=None, dead=None) -> list:
+    """
+    窮舉所有剩餘顯牌組合計算精確勝率
+    顯牌逐張累加點數多重集合鍵與花色遮罩，翻牌、轉牌層的結果由其下所有河牌共用，
+    非同花牌力以點數多重集合查表(RANK_STRENGTH)，同花以花色遮罩查表(FLUSH_BEST_TABLE)
+    :param hands: 各玩家手牌 [['p1', 'h1'], ['c13', 't13'], ...]
+    :param board: 已出現的顯牌(0~5張)
+    :param dead: 死牌
+    :return: [{"win":float, "tie":float, "equity":float, "ci":(float, float)}, ...]
+    """
+    hand_codes, board_codes, remaining = prepare_cards(hands, board, dead)
+    player_num = len(hand_codes)
+    wins, ties, shares = [0] * player_num, [0] * player_num, [0.0] * player_num
+    missing = 5 - len(board_codes)
+    if missing == 0:
+        tally_showdown(hand_codes, board_codes, wins, ties, shares, [0.0] * player_num)
+        return summarize(1, wins, ties, shares)
+
+    hand_keys = [sum(RANK_COUNT_KEY[code] for code in hand) for hand in hand_codes]
+    hand_suit_masks = []
+    for hand in hand_codes:
+        suit_masks = [0, 0, 0, 0]
+        for code in hand:
+            suit_masks[code & 3] |= 1 << (code >> 2)
+        hand_suit_masks.append(suit_masks)
+    players = range(player_num)
+
+    def tally_river(start, board_key, board_masks, board_counts):
+        # 轉牌層已成形的同花花色(顯牌同花色達3張)
+        turn_flush_suit = -1
+        for suit in range(4):
+            if board_counts[suit] >= 3:
+                turn_flush_suit = suit
+        for code in remaining[start:]:
+            river_key = board_key + RANK_COUNT_KEY[code]
+            suit = code & 3
+            if board_counts[suit] >= 2:
+                flush_suit, flush_mask = suit, board_masks[suit] | 1 << (code >> 2)
+            elif turn_flush_suit >= 0:
+                flush_suit, flush_mask = turn_flush_suit, board_masks[turn_flush_suit]
+            else:
+                flush_suit = -1
+            strengths = [RANK_STRENGTH[hand_keys[index] + river_key] for index in players]
+            if flush_suit >= 0:
+                for index in players:
+                    flush_strength = FLUSH_BEST_TABLE[hand_suit_masks[index][flush_suit] | flush_mask]
+                    if flush_strength:
+                        strengths[index] = flush_strength
+            best = max(strengths)
+            winner_num = strengths.count(best)
+            if winner_num == 1:
+                index = strengths.index(best)
+                wins[index] += 1
+                shares[index] += 1
+            else:
+                share = 1 / winner_num
+                for index in players:
+                    if strengths[index] == best:
+                        ties[index] += 1
+                        shares[index] += share
+
+    def walk(start, left, board_key, board_masks, board_counts):
+        if left == 1:
+            tally_river(start, board_key, board_masks, board_counts)
+            return
+        for index in range(start, len(remaining) - left + 1):
+            code = remaining[index]
+            suit = code & 3
+            next_masks = list(board_masks)
+            next_masks[suit] |= 1 << (code >> 2)
+            next_counts = list(board_counts)
+            next_counts[suit] += 1
+            walk(index + 1, left - 1, board_key + RANK_COUNT_KEY[code], next_masks, next_counts)
+
+    board_masks, board_counts = [0, 0, 0, 0], [0, 0, 0, 0]
+    for code in board_codes:
+        board_masks[code & 3] |= 1 << (code >> 2)
+        board_counts[code & 3] += 1
+    walk(0, missing, sum(RANK_COUNT_KEY[code] for code in board_codes), board_masks, board_counts)
+    return summarize(comb(len(remaining), missing), wins, ties, shares)
+
+
+if __name__ == '__main__':
+    for player_result in monte_carlo_equity([['p1', 'h1'], ['c13', 't12']], trials=20000, seed=1):
+        print(player_result)
@@ -0,0 +1,532 @@
+"""
+快速牌力評估
+
+卡牌以整數編碼: code = (點數 - 2) << 2 | 花色索引
+    點數: 2 ~ 14 (A 視為 14)
+    花色索引: 依 PokerDefinition._type_limit 順序 (p、h、c、t)
+牌力(strength)為單一整數，數字越大牌越大:
+    strength = 牌型階級 << 20 | 由大到小的五個點數(每個 4 bits)
+"""
+import mmap
+import os
+import struct
+from array import array
+from itertools import combinations
+
+from PokerRule import PokerCard, PokerDefinition, _convert_poker_type, card_of_code
+from PokerSharedTables import attach_shared_buffer
+
+# 牌型階級(與 TexasHoldem.CardTypeStageEnum 對應)
+STAGE_ROYAL_FLUSH = 100
+STAGE_STRAIGHT_FLUSH = 99
+STAGE_FOUR_KIND = 98
+STAGE_FULL_HOUSE = 97
+STAGE_FLUSH = 96
+STAGE_STRAIGHT = 95
+STAGE_THREE_KIND = 94
+STAGE_TWO_PAIR = 93
+STAGE_ONE_PAIR = 92
+STAGE_HIGH_CARD = 0
+
+STAGE_SHIFT = 20
+
+SUITS = PokerDefinition._type_limit
+SUIT_IMGS = PokerDefinition._type_img
+RANKS = tuple(range(2, 15))
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+# 各卡牌編碼對應的點數位元、花色位元、質數
+_RANK_BIT = tuple(1 << (code >> 2) for code in range(52))
+_SUIT_BIT = tuple(1 << (code & 3) for code in range(52))
+_PRIME = tuple(PRIMES[code >> 2] for code in range(52))
+
+# 預先計算的查表檔，import 時以 mmap 讀取，不需重新計算
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'evaluator_tables.bin')
+# 檔頭: 識別碼、版本、質數乘積表筆數 (其後為本機位元組序的 int32 陣列)
+_TABLE_HEADER = struct.Struct('<4sHH')
+_TABLE_MAGIC = b'PKEV'
+_TABLE_VERSION = 1
+_MASK_TABLE_SIZE = 8192
+_MASK_TABLE_NAMES = ('FLUSH_TABLE', 'UNIQUE5_TABLE', 'STRAIGHT_HIGH_TABLE', 'FLUSH_BEST_TABLE')
+
+_COMBINATIONS_OF = {
+    6: tuple(combinations(range(6), 5)),
+    7: tuple(combinations(range(7), 5)),
+}
+
+
+def make_strength(stage, ranks):
+    """
+    組合牌力整數
+    :param stage: 牌型階級
+    :param ranks: 由大到小的比較點數(最多5個)
+    :return: int
+    """
+    strength = stage
+    for index in range(5):
+        strength = strength << 4 | (ranks[index] if index < len(ranks) else 0)
+    return strength
+
+
+def strength_stage(strength):
+    """
+    從牌力取出牌型階級
+    :param strength:
+    :return: int
+    """
+    return strength >> STAGE_SHIFT
+
+
+def _straight_high(rank_mask):
+    """
+    點數遮罩中最大的順子
+    :param rank_mask: 點數位元遮罩
+    :return: 最大點數(A-2-3-4-5 為5，無順子為0)
+    """
+    for high in range(14, 5, -1):
+        straight_mask = 0b11111 << (high - 6)
+        if rank_mask & straight_mask == straight_mask:
+            return high
+    if rank_mask & 0b1000000001111 == 0b1000000001111:
+        return 5
+    return 0
+
+
+def build_tables(ranks=RANKS, straight_high=_straight_high, stage_map=None) -> dict:
+    """
+    計算查表式評估使用的各表(預設為標準德州撲克，其他玩法可傳入自己的點數、順子與牌型階級規則)
+    FLUSH_TABLE: 五個不同點數的位元遮罩 => 同花/同花順牌力
+    UNIQUE5_TABLE: 五個不同點數的位元遮罩 => 順子/雜牌牌力
+    PRODUCT_TABLE: 有重複點數的五張牌的質數乘積 => 牌力
+    STRAIGHT_HIGH_TABLE: 點數位元遮罩 => 其中最大順子的最大點數(無順子為0)
+    FLUSH_BEST_TABLE: 同一花色的點數位元遮罩 => 最佳同花/同花順牌力(不足五張為0)
+    :param ranks: 牌組使用的點數
+    :param straight_high: 點數遮罩 => 其中最大順子的最大點數(無順子為0)
+    :param stage_map: 牌型階級的替換 {原階級: 新階級}(例如短牌同花大於葫蘆)
+    :return: {表名稱: list 或 dict}
+    """
+    stage_map = stage_map or {}
+
+    def strength_of(stage, stage_ranks):
+        return make_strength(stage_map.get(stage, stage), stage_ranks)
+
+    flush_table = [0] * _MASK_TABLE_SIZE
+    unique5_table = [0] * _MASK_TABLE_SIZE
+    product_table = {}
+    straight_high_table = [0] * _MASK_TABLE_SIZE
+    flush_best_table = [0] * _MASK_TABLE_SIZE
+    desc_ranks = tuple(reversed(ranks))
+    for rank_group in combinations(desc_ranks, 5):
+        rank_mask = 0
+        for rank in rank_group:
+            rank_mask |= 1 << (rank - 2)
+        high = straight_high(rank_mask)
+        if high:
+            flush_stage = STAGE_ROYAL_FLUSH if high == 14 else STAGE_STRAIGHT_FLUSH
+            flush_table[rank_mask] = strength_of(flush_stage, [high])
+            unique5_table[rank_mask] = strength_of(STAGE_STRAIGHT, [high])
+        else:
+            flush_table[rank_mask] = strength_of(STAGE_FLUSH, rank_group)
+            unique5_table[rank_mask] = strength_of(STAGE_HIGH_CARD, rank_group)
+
+    def prime_of(rank):
+        return PRIMES[rank - 2]
+
+    for main in desc_ranks:
+        others = [rank for rank in desc_ranks if rank != main]
+        for kicker in others:
+            product_table[prime_of(main) ** 4 * prime_of(kicker)] = \
+                strength_of(STAGE_FOUR_KIND, [main, kicker])
+            product_table[prime_of(main) ** 3 * prime_of(kicker) ** 2] = \
+                strength_of(STAGE_FULL_HOUSE, [main, kicker])
+        for kicker_1, kicker_2 in combinations(others, 2):
+            product_table[prime_of(main) ** 3 * prime_of(kicker_1) * prime_of(kicker_2)] = \
+                strength_of(STAGE_THREE_KIND, [main, kicker_1, kicker_2])
+        for kicker_1, kicker_2, kicker_3 in combinations(others, 3):
+            product_table[prime_of(main) ** 2 * prime_of(kicker_1) * prime_of(kicker_2) * prime_of(kicker_3)] = \
+                strength_of(STAGE_ONE_PAIR, [main, kicker_1, kicker_2, kicker_3])
+    for high_pair, low_pair in combinations(desc_ranks, 2):
+        for kicker in desc_ranks:
+            if kicker in (high_pair, low_pair):
+                continue
+            product_table[prime_of(high_pair) ** 2 * prime_of(low_pair) ** 2 * prime_of(kicker)] = \
+                strength_of(STAGE_TWO_PAIR, [high_pair, low_pair, kicker])
+
+    for rank_mask in range(_MASK_TABLE_SIZE):
+        straight_high_table[rank_mask] = straight_high(rank_mask)
+        if bin(rank_mask).count('1') < 5:
+            continue
+        high = straight_high_table[rank_mask]
+        if high:
+            stage = STAGE_ROYAL_FLUSH if high == 14 else STAGE_STRAIGHT_FLUSH
+            flush_best_table[rank_mask] = strength_of(stage, [high])
+        else:
+            flush_ranks = [rank_index + 2 for rank_index in range(12, -1, -1) if rank_mask >> rank_index & 1][:5]
+            flush_best_table[rank_mask] = strength_of(STAGE_FLUSH, flush_ranks)
+    return {
+        'FLUSH_TABLE': flush_table,
+        'UNIQUE5_TABLE': unique5_table,
+        'PRODUCT_TABLE': product_table,
+        'STRAIGHT_HIGH_TABLE': straight_high_table,
+        'FLUSH_BEST_TABLE': flush_best_table,
+    }
+
+
+def save_tables(tables: dict, path=DEFAULT_TABLE_PATH):
+    """
+    寫入查表檔(點數遮罩表依 _MASK_TABLE_NAMES 順序，其後為質數乘積表的鍵與值)
+    :param tables: build_tables 的結果
+    :param path: 檔案路徑
+    :return:
+    """
+    product_items = sorted(tables['PRODUCT_TABLE'].items())
+    with open(path, 'wb') as file:
+        file.write(_TABLE_HEADER.pack(_TABLE_MAGIC, _TABLE_VERSION, len(product_items)))
+        for name in _MASK_TABLE_NAMES:
+            array('i', tables[name]).tofile(file)
+        array('i', [key for key, _ in product_items]).tofile(file)
+        array('i', [value for _, value in product_items]).tofile(file)
+
+
+def _read_tables(buffer, copy=True):
+    """
+    解析查表檔內容
+    :param buffer: 查表檔內容(mmap)
+    :param copy: 是否轉為 list；否則點數遮罩表直接使用 buffer 上的 memoryview(不複製)
+    :return: {表名稱: list、memoryview 或 dict}，格式或版本不符時為 None
+    """
+    magic, version, product_num = _TABLE_HEADER.unpack_from(buffer)
+    if magic != _TABLE_MAGIC or version != _TABLE_VERSION:
+        return None
+    values = memoryview(buffer)[_TABLE_HEADER.size:].cast('i')
+    tables = {}
+    offset = 0
+    for name in _MASK_TABLE_NAMES:
+        table = values[offset:offset + _MASK_TABLE_SIZE]
+        tables[name] = table.tolist() if copy else table
+        offset += _MASK_TABLE_SIZE
+    # 質數乘積表需要雜湊查詢，一律建立 dict(約 5,000 筆)
+    keys = values[offset:offset + product_num].tolist()
+    tables['PRODUCT_TABLE'] = dict(zip(keys, values[offset + product_num:offset + 2 * product_num].tolist()))
+    if copy:
+        values.release()
+    return tables
+
+
+def load_tables(path=DEFAULT_TABLE_PATH, build_if_missing=True, builder=None) -> dict:
+    """
+    以 mmap 讀取查表檔，檔案不存在或版本不符時重新計算並寫入
+    表內容轉為 list / dict，查表速度與直接計算的表相同；
+    行程設定了共享查表(PokerSharedTables)時，改為直接使用共享檔映射上的 memoryview，不複製
+    (各行程省下約 1 MB，但 memoryview 查表使 evaluate5 約慢 5~20%)
+    :param path: 檔案路徑
+    :param build_if_missing: 檔案不存在時是否重新產生
+    :param builder: 產生各表的函式(預設 build_tables，其他玩法可傳入自己的產生函式)
+    :return: {表名稱: list、memoryview 或 dict}
+    """
+    shared = attach_shared_buffer(path)
+    if shared is not None:
+        tables = _read_tables(shared, copy=False)
+        if tables is not None:
+            return tables
+    if os.path.exists(path):
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            tables = _read_tables(mapped)
+        if tables is not None:
+            return tables
+    if not build_if_missing:
+        raise FileNotFoundError(f'找不到牌力查表檔: {path}')
+    tables = (builder or build_tables)()
+    try:
+        save_tables(tables, path)
+    except OSError:
+        # 無法寫入(唯讀目錄)時僅使用本次計算的結果
+        pass
+    return tables
+
+
+# 刻意在 import 時載入並轉為 list(讀檔加轉換約 1 ms、每個行程約 1 MB):
+# 延遲到首次評估才載入，每次查表都要多一次檢查，且其他模組以 from PokerEvaluator import 直接綁定各表；
+# 直接使用 mmap 上的 memoryview 則 evaluate5 約慢 5~20%。檔案不存在時才重新計算(約 35 ms)並寫回
+_tables = load_tables()
+FLUSH_TABLE = _tables['FLUSH_TABLE']
+UNIQUE5_TABLE = _tables['UNIQUE5_TABLE']
+PRODUCT_TABLE = _tables['PRODUCT_TABLE']
+STRAIGHT_HIGH_TABLE = _tables['STRAIGHT_HIGH_TABLE']
+FLUSH_BEST_TABLE = _tables['FLUSH_BEST_TABLE']
+del _tables
+
+
+# 卡牌編碼轉換('p5' 寫法與 '♠5' 圖示寫法皆可)
+def _card_number(code):
+    return 1 if code >> 2 == 12 else (code >> 2) + 2
+
+
+_CODE_BY_TEXT = {f'{SUITS[code & 3]}{_card_number(code)}': code for code in range(52)}
+_CODE_BY_TEXT.update({f'{SUIT_IMGS[code & 3]}{_card_number(code)}': code for code in range(52)})
+
+
+def encode_card(card) -> int:
+    """
+    轉換為卡牌整數編碼
+    :param card: PokerCard、'p5'、'♠5' 或已編碼的 int
+    :return: int
+    """
+    if isinstance(card, int):
+        return card
+    if isinstance(card, PokerCard):
+        return card.code
+    if card in _CODE_BY_TEXT:
+        return _CODE_BY_TEXT[card]
+    return _convert_poker_type(card).code
+
+
+def encode_cards(card_list) -> list:
+    """
+    批次轉換卡牌整數編碼
+    :param card_list:
+    :return: [int,...]
+    """
+    return [encode_card(card) for card in card_list]
+
+
+def decode_card(code: int, as_class=True):
+    """
+    卡牌整數編碼轉回 PokerCard
+    :param code: 卡牌編碼
+    :param as_class: 回傳class格式，否則回傳 'p5' 寫法
+    :return:
+    """
+    if as_class:
+        return card_of_code(code)
+    return f'{SUITS[code & 3]}{_card_number(code)}'
+
+
+# 牌力評估
+def make_evaluate5(flush_table, unique5_table, product_table):
+    """
+    產生以指定查表評估五張牌的函式(其他玩法傳入 build_tables 產生的自己的查表)
+    :param flush_table: FLUSH_TABLE
+    :param unique5_table: UNIQUE5_TABLE
+    :param product_table: PRODUCT_TABLE
+    :return: evaluate5(c0, c1, c2, c3, c4) -> int
+    """
+    rank_bit, suit_bit, prime = _RANK_BIT, _SUIT_BIT, _PRIME
+
+    def evaluate5(c0, c1, c2, c3, c4) -> int:
+        """
+        評估五張牌
+        :return: 牌力(int)
+        """
+        rank_mask = rank_bit[c0] | rank_bit[c1] | rank_bit[c2] | rank_bit[c3] | rank_bit[c4]
+        if suit_bit[c0] & suit_bit[c1] & suit_bit[c2] & suit_bit[c3] & suit_bit[c4]:
+            return flush_table[rank_mask]
+        strength = unique5_table[rank_mask]
+        if strength:
+            return strength
+        return product_table[prime[c0] * prime[c1] * prime[c2] * prime[c3] * prime[c4]]
+
+    return evaluate5
+
+
+evaluate5 = make_evaluate5(FLUSH_TABLE, UNIQUE5_TABLE, PRODUCT_TABLE)
+
+
+def evaluate7(codes) -> int:
+    """
+    評估六或七張牌(取最佳五張)
+    :param codes: 卡牌編碼 list
+    :return: 牌力(int)
+    """
+    best = 0
+    for i0, i1, i2, i3, i4 in _COMBINATIONS_OF[len(codes)]:
+        strength = evaluate5(codes[i0], codes[i1], codes[i2], codes[i3], codes[i4])
+        if strength > best:
+            best = strength
+    return best
+
+
+def evaluate(card_list) -> int:
+    """
+    評估任意張數的牌力(超過7張時取所有五張組合中最大者)
+    :param card_list: PokerCard、'p5' 或卡牌編碼
+    :return: 牌力(int)
+    """
+    codes = encode_cards(card_list)
+    if len(codes) == 5:
+        return evaluate5(*codes)
+    if len(codes) <= 7:
+        return evaluate_best(codes)[1]
+    return max(evaluate5(*sub_codes) for sub_codes in combinations(codes, 5))
+
+
+def _straight_rank_indexes(high):
+    """
+    順子由大到小的點數索引
+    :param high: 順子最大點數
+    :return: [int,...]
+    """
+    if high == 5:
+        return [3, 2, 1, 0, 12]
+    return list(range(high - 2, high - 7, -1))
+
+
+def evaluate_best(codes) -> (list, int):
+    """
+    一次掃描評估任意張數(最多7張)的最佳組合，不需列舉所有五張組合
+    以點數分組與花色數量判斷，七張以內出現同花時不可能同時成立鐵支或葫蘆
+    :param codes: 卡牌編碼 list
+    :return: 最佳五張(不足五張則為全部)的卡牌編碼, 牌力(int)
+    """
+    ordered = sorted(codes, reverse=True)
+    suit_counts = [0, 0, 0, 0]
+    for code in ordered:
+        suit_counts[code & 3] += 1
+
+    # 同花 / 同花順
+    if len(ordered) >= 5:
+        for suit in range(4):
+            if suit_counts[suit] < 5:
+                continue
+            suited = [code for code in ordered if code & 3 == suit]
+            suit_mask = 0
+            for code in suited:
+                suit_mask |= _RANK_BIT[code]
+            high = STRAIGHT_HIGH_TABLE[suit_mask]
+            if high:
+                stage = STAGE_ROYAL_FLUSH if high == 14 else STAGE_STRAIGHT_FLUSH
+                best_codes = [rank_index << 2 | suit for rank_index in _straight_rank_indexes(high)]
+                return best_codes, make_strength(stage, [high])
+            best_codes = suited[:5]
+            return best_codes, make_strength(STAGE_FLUSH, [(code >> 2) + 2 for code in best_codes])
+
+    # 依點數分組，再依數量由多到少排序(同數量維持點數由大到小)
+    groups = []
+    rank_mask = 0
+    last_rank = -1
+    for code in ordered:
+        rank_index = code >> 2
+        if rank_index == last_rank:
+            groups[-1].append(code)
+        else:
+            groups.append([code])
+            last_rank = rank_index
+            rank_mask |= 1 << rank_index
+    groups.sort(key=len, reverse=True)
+    first_count = len(groups[0]) if groups else 0
+
+    if first_count == 4:
+        rest = groups[1:]
+        if rest:
+            kicker = max(rest)[0]
+            return groups[0] + [kicker], make_strength(STAGE_FOUR_KIND, [(groups[0][0] >> 2) + 2, (kicker >> 2) + 2])
+        return groups[0], make_strength(STAGE_FOUR_KIND, [(groups[0][0] >> 2) + 2])
+
+    if first_count == 3 and len(groups) > 1 and len(groups[1]) >= 2:
+        pair = max(group for group in groups[1:] if len(group) >= 2)[:2]
+        return groups[0] + pair, make_strength(STAGE_FULL_HOUSE, [(groups[0][0] >> 2) + 2, (pair[0] >> 2) + 2])
+
+    high = STRAIGHT_HIGH_TABLE[rank_mask]
+    if high:
+        first_of = {group[0] >> 2: group[0] for group in groups}
+        best_codes = [first_of[rank_index] for rank_index in _straight_rank_indexes(high)]
+        return best_codes, make_strength(STAGE_STRAIGHT, [high])
+
+    if first_count == 3:
+        stage, main = STAGE_THREE_KIND, groups[:1]
+        tail = [group[0] for group in groups[1:3]]
+    elif first_count == 2 and len(groups) > 1 and len(groups[1]) == 2:
+        stage, main = STAGE_TWO_PAIR, groups[:2]
+        tail = [max(groups[2:])[0]] if len(groups) > 2 else []
+    elif first_count == 2:
+        stage, main = STAGE_ONE_PAIR, groups[:1]
+        tail = [group[0] for group in groups[1:4]]
+    else:
+        stage, main = STAGE_HIGH_CARD, []
+        tail = ordered[:5]
+    best_codes = []
+    ranks = []
+    for group in main:
+        best_codes += group
+        ranks.append((group[0] >> 2) + 2)
+    best_codes += tail
+    ranks += [(code >> 2) + 2 for code in tail]
+    return best_codes, make_strength(stage, ranks)
+
+
+# 點數多重集合鍵: 每個點數佔 3 bits 記錄張數，可直接相加累計
+RANK_COUNT_KEY = tuple(1 << 3 * (code >> 2) for code in range(52))
+
+
+class RankStrengthCache(dict):
+    """
+    點數多重集合鍵 => 不計同花時的最佳牌力(首次查詢時計算後保存)
+    :param evaluate5: 其他玩法的五張評估函式(make_evaluate5 產生)，預設為標準德州撲克；
+        不足五張時不會成立順子、葫蘆，各玩法相同
+    """
+
+    def __init__(self, evaluate5=None):
+        super().__init__()
+        self.evaluate5 = evaluate5
+
+    def __missing__(self, rank_key):
+        codes = []
+        for rank_index in range(13):
+            for _ in range(rank_key >> 3 * rank_index & 7):
+                # 依序輪替花色，確保不會組成同花
+                codes.append(rank_index << 2 | len(codes) & 3)
+        if self.evaluate5 is None or len(codes) < 5:
+            strength = evaluate_best(codes)[1]
+        else:
+            strength = max(self.evaluate5(*sub_codes) for sub_codes in combinations(codes, 5))
+        self[rank_key] = strength
+        return strength
+
+
+RANK_STRENGTH = RankStrengthCache()
+
+
+class HandState:
+    """
+    逐張累加的手牌狀態(點數多重集合鍵、點數遮罩、各花色遮罩與數量)
+    每加入一張牌只需 O(1) 更新，牌力以查表取得，適合翻牌、轉牌、河牌逐街更新
+    其他玩法的子類別只需替換 rank_strength、flush_best_table 兩個查表
+    :param codes: 初始卡牌編碼(手牌)
+    """
+    __slots__ = ('rank_key', 'rank_mask', 'suit_masks', 'suit_counts', 'card_num', 'strength')
+    rank_strength = RANK_STRENGTH
+    flush_best_table = FLUSH_BEST_TABLE
+
+    def __init__(self, codes=()):
+        self.rank_key = 0
+        self.rank_mask = 0
+        self.suit_masks = [0, 0, 0, 0]
+        self.suit_counts = [0, 0, 0, 0]
+        self.card_num = 0
+        self.strength = 0
+        self.add(codes)
+
+    def add(self, codes) -> int:
+        """
+        加入卡牌並更新牌力
+        :param codes: 卡牌編碼
+        :return: 牌力(int)
+        """
+        # 先檢查張數再更新，超過時狀態維持不變(codes 可能是產生器，先轉為 tuple)
+        codes = tuple(codes)
+        if self.card_num + len(codes) > 7:
+            raise ValueError(f'最多只能累加7張牌，目前為{self.card_num}張，加入{len(codes)}張')
+        for code in codes:
+            suit = code & 3
+            self.rank_key += RANK_COUNT_KEY[code]
+            self.rank_mask |= _RANK_BIT[code]
+            self.suit_masks[suit] |= _RANK_BIT[code]
+            self.suit_counts[suit] += 1
+            self.card_num += 1
+        strength = self.rank_strength[self.rank_key]
+        # 七張以內成立同花時，不可能同時成立鐵支或葫蘆
+        for suit in range(4):
+            if self.suit_counts[suit] >= 5:
+                strength = self.flush_best_table[self.suit_masks[suit]]
+        self.strength = strength
+        return strength
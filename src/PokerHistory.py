@@ -0,0 +1,210 @@
+"""
+牌局紀錄串流與欄式匯出
+
+hand_stream 以產生器逐局產出精簡紀錄(手牌、顯牌、牌型、各街領先座位)，
+HistoryWriter 依固定筆數分批寫出: 有安裝 pyarrow 時寫 Parquet，否則寫固定長度的二進位檔(或 CSV)，
+模擬局數再多記憶體用量也固定
+"""
+import csv
+import struct
+import sys
+from collections import namedtuple
+
+from poker_test import ClassicPokerGame, Player, GameType, HOLE_NUMBER
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# holes: 各座位手牌編碼(每座位張數依玩法，德州撲克2張、奧馬哈4張), board: 五張顯牌編碼, stages: 各座位河牌時的牌型階級,
+# street_winners: 翻牌前、翻牌、轉牌、河牌時的領先座位號碼
+HandRecord = namedtuple('HandRecord', ['hand_id', 'holes', 'board', 'stages', 'street_winners'])
+
+FORMATS = ('parquet', 'packed', 'csv')
+DEFAULT_BATCH_SIZE = 65536
+# 二進位檔頭: 識別碼、玩家人數、玩法索引(依 GameType 定義順序)
+_PACKED_HEADER = struct.Struct('<4sHB')
+_PACKED_MAGIC = b'PHH2'
+_GAME_TYPES = tuple(GameType)
+
+
+def _record_struct(player_num: int, game_type=GameType.Holdem) -> struct.Struct:
+    return struct.Struct(f'<Q{player_num * HOLE_NUMBER[game_type]}s5s{player_num}s4s')
+
+
+def hand_stream(game: ClassicPokerGame, hands=None, start_id=0):
+    """
+    重複使用同一個牌局逐局模擬並產出紀錄
+    :param game: 牌局
+    :param hands: 局數(None 為無限)
+    :param start_id: 第一局的編號
+    :return: HandRecord 產生器
+    """
+    hand_id = start_id
+    end_id = None if hands is None else start_id + hands
+    while end_id is None or hand_id < end_id:
+        game.reset()
+        game.game_start()
+        game.deal_all()
+        # 只記錄領先座位，不需整理各街的最佳組合
+        street_winners = [game.leader]
+        for add_num in (3, 1, 1):
+            game.add_appear_card(add_num)
+            street_winners.append(game.leader)
+        seats = range(1, len(game.players) + 1)
+        yield HandRecord(
+            hand_id,
+            bytes(card.code for player in game.players for card in player.show_hand(as_class=True)),
+            bytes(game.appear_codes),
+            bytes(game.player_stage(num) for num in seats),
+            bytes(street_winners),
+        )
+        hand_id += 1
+
+
+class HistoryWriter:
+    """
+    分批寫出牌局紀錄
+    :param path: 檔案路徑
+    :param player_num: 玩家人數(每筆紀錄長度固定)
+    :param batch_size: 每批筆數
+    :param file_format: 'parquet'、'packed'、'csv'，None 則有 pyarrow 時為 parquet，否則為 packed
+    :param game_type: 玩法(決定每座位的手牌張數，並寫入檔頭 / schema)
+    """
+
+    def __init__(self, path, player_num: int, batch_size=DEFAULT_BATCH_SIZE, file_format=None,
+                 game_type=GameType.Holdem):
+        if file_format is None:
+            file_format = 'parquet' if pyarrow is not None else 'packed'
+        if file_format not in FORMATS:
+            raise ValueError(f'不支援的格式: {file_format}')
+        if file_format == 'parquet' and pyarrow is None:
+            raise ImportError('寫出 Parquet 需安裝 pyarrow')
+        self.path = path
+        self.player_num = player_num
+        self.game_type = game_type
+        self._holes_size = player_num * HOLE_NUMBER[game_type]
+        self.batch_size = batch_size
+        self.file_format = file_format
+        self.count = 0
+        self._batch = []
+        self._parquet_writer = None
+        self._file = None
+        self._csv_writer = None
+        if file_format == 'packed':
+            self._record_struct = _record_struct(player_num, game_type)
+            self._file = open(path, 'wb')
+            self._file.write(_PACKED_HEADER.pack(_PACKED_MAGIC, player_num, _GAME_TYPES.index(game_type)))
+        elif file_format == 'csv':
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+            self._csv_writer = csv.writer(self._file)
+            self._csv_writer.writerow(HandRecord._fields)
+        else:
+            self._schema = pyarrow.schema([
+                ('hand_id', pyarrow.int64()),
+                ('holes', pyarrow.binary(self._holes_size)),
+                ('board', pyarrow.binary(5)),
+                ('stages', pyarrow.binary(player_num)),
+                ('street_winners', pyarrow.binary(4)),
+            ], metadata={'game_type': game_type.value})
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, record: HandRecord):
+        # 二進位檔為固定長度，張數不符時會被截斷，因此寫入前先檢查
+        if len(record.holes) != self._holes_size:
+            raise ValueError(f'{self.game_type.name} 手牌長度應為{self._holes_size}，目前為{len(record.holes)}')
+        self._batch.append(record)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def write_all(self, records) -> int:
+        """
+        寫出所有紀錄(可為產生器)
+        :return: 寫出筆數
+        """
+        start = self.count + len(self._batch)
+        for record in records:
+            self.write(record)
+        return self.count + len(self._batch) - start
+
+    def flush(self):
+        """
+        寫出目前累積的一批
+        :return:
+        """
+        if not self._batch:
+            return
+        if self.file_format == 'packed':
+            pack = self._record_struct.pack
+            self._file.write(b''.join(pack(*record) for record in self._batch))
+        elif self.file_format == 'csv':
+            self._csv_writer.writerows(
+                (record.hand_id, *(field.hex() for field in record[1:])) for record in self._batch)
+        else:
+            columns = list(zip(*self._batch))
+            self._parquet_writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+                schema=self._schema))
+        self.count += len(self._batch)
+        self._batch.clear()
+
+    def close(self):
+        self.flush()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _read_packed_header(file, path) -> (int, GameType):
+    header = file.read(_PACKED_HEADER.size)
+    if len(header) != _PACKED_HEADER.size or header[:4] != _PACKED_MAGIC:
+        raise ValueError(f'牌局紀錄檔格式錯誤: {path}')
+    _, player_num, game_index = _PACKED_HEADER.unpack(header)
+    return player_num, _GAME_TYPES[game_index]
+
+
+def read_packed_info(path) -> (int, GameType):
+    """
+    讀取二進位紀錄檔的玩家人數與玩法
+    :param path: 檔案路徑
+    :return: 玩家人數, GameType
+    """
+    with open(path, 'rb') as file:
+        return _read_packed_header(file, path)
+
+
+def read_packed(path, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    逐筆讀取二進位紀錄檔
+    :param path: 檔案路徑
+    :param batch_size: 每次讀取筆數
+    :return: HandRecord 產生器
+    """
+    with open(path, 'rb') as file:
+        player_num, game_type = _read_packed_header(file, path)
+        record_struct = _record_struct(player_num, game_type)
+        while True:
+            chunk = file.read(record_struct.size * batch_size)
+            if not chunk:
+                break
+            for fields in record_struct.iter_unpack(chunk):
+                yield HandRecord(*fields)
+
+
+if __name__ == '__main__':
+    # python PokerHistory.py 輸出路徑 局數 [玩家人數]
+    output_path = sys.argv[1] if len(sys.argv) > 1 else 'hand_history.parquet'
+    hand_num = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    player_total = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    history_game = ClassicPokerGame(_players=[Player(f'Player_{num}') for num in range(1, player_total + 1)])
+    with HistoryWriter(output_path, player_total, game_type=history_game.game_type) as writer:
+        print('寫出筆數:', writer.write_all(hand_stream(history_game, hand_num)), writer.file_format)
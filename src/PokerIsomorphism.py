@@ -0,0 +1,160 @@
+"""
+花色同構正規化
+
+只差在花色互換(p、h、c、t 重新對應)的牌局，勝率、牌型機率都相同。
+將手牌、顯牌等各組牌的花色依固定規則重新編號作為正規形式，
+相同正規形式的查詢即可共用快取(起手牌 169 類、翻牌 1,755 種)
+"""
+from collections import Counter, OrderedDict
+from itertools import combinations, permutations
+
+from PokerEquity import exhaustive_equity
+from PokerEvaluator import encode_cards
+from PokerOuts import hand_type_odds
+
+SUIT_PERMUTATIONS = tuple(permutations(range(4)))
+_PERMUTATION_INDEX = {permutation: index for index, permutation in enumerate(SUIT_PERMUTATIONS)}
+# 各花色排列下，卡牌編碼 => 換花色後的編碼
+_PERMUTED_CODE = tuple(tuple(code & ~3 | permutation[code & 3] for code in range(52))
+                       for permutation in SUIT_PERMUTATIONS)
+# 各花色排列的反向對應
+_INVERSE_CODE = tuple(tuple(mapping.index(code) for code in range(52)) for mapping in _PERMUTED_CODE)
+
+
+def canonical_form(groups) -> (tuple, int):
+    """
+    多組牌的正規形式(組的順序保留，組內不計順序)
+    依各花色在每組牌中的點數(特徵)排序後重新編號花色，特徵相同的花色互換結果不變，
+    因此只差在花色互換的牌局必定得到相同的正規形式
+    :param groups: [[卡牌編碼, ...], ...]
+    :return: 正規形式 ((卡牌編碼, ...), ...), 使用的花色排列索引
+    """
+    suit_ranks = [[[] for _ in groups] for _ in range(4)]
+    for group_index, group in enumerate(groups):
+        for code in group:
+            suit_ranks[code & 3][group_index].append(code >> 2)
+    signatures = [tuple(tuple(sorted(ranks)) for ranks in group_ranks) for group_ranks in suit_ranks]
+    new_suit = [0, 0, 0, 0]
+    for new, old in enumerate(sorted(range(4), key=signatures.__getitem__, reverse=True)):
+        new_suit[old] = new
+    key = tuple(tuple(sorted(code & ~3 | new_suit[code & 3] for code in group)) for group in groups)
+    return key, _PERMUTATION_INDEX[tuple(new_suit)]
+
+
+def to_original(codes, permutation_index: int) -> list:
+    """
+    將正規形式下的卡牌編碼換回原本的花色
+    :param codes: 正規形式下的卡牌編碼
+    :param permutation_index: canonical_form 回傳的花色排列索引
+    :return: [int, ...]
+    """
+    inverse = _INVERSE_CODE[permutation_index]
+    return [inverse[code] for code in codes]
+
+
+def canonical_hand(hand) -> tuple:
+    """
+    起手牌正規形式(共 169 種)
+    :param hand: 兩張手牌
+    :return: (卡牌編碼, 卡牌編碼)
+    """
+    return canonical_form([encode_cards(hand)])[0][0]
+
+
+def canonical_board(board) -> tuple:
+    """
+    顯牌正規形式(翻牌共 1,755 種)
+    :param board: 顯牌
+    :return: (卡牌編碼, ...)
+    """
+    return canonical_form([encode_cards(board)])[0][0]
+
+
+def canonical_flops() -> list:
+    """
+    所有正規翻牌與其對應的原始翻牌數(權重總和為 C(52,3) = 22100)
+    可用於窮舉全部翻牌的預先計算
+    :return: [((卡牌編碼, 卡牌編碼, 卡牌編碼), 權重), ...]
+    """
+    return sorted(Counter(canonical_board(flop) for flop in combinations(range(52), 3)).items())
+
+
+class CanonicalCache:
+    """
+    以正規形式為鍵的 LRU 快取
+    :param maxsize: 最多保留的筆數
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, compute):
+        """
+        取得快取結果，不存在時以 compute() 計算後保存
+        :param key: 正規形式
+        :param compute: 計算函式
+        :return:
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        value = compute()
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+equity_cache = CanonicalCache()
+outs_cache = CanonicalCache()
+
+
+def _canonical_groups(hands, board, dead) -> (tuple, int):
+    groups = [encode_cards(hand) for hand in hands]
+    groups.append(encode_cards(board or []))
+    groups.append(encode_cards(dead or []))
+    return canonical_form(groups)
+
+
+def canonical_exhaustive_equity(hands: list, board=None, dead=None, cache=None) -> list:
+    """
+    以正規形式快取的窮舉勝率(花色互換的查詢共用同一筆結果)
+    :param hands: 各玩家手牌
+    :param board: 已出現的顯牌
+    :param dead: 死牌
+    :param cache: CanonicalCache(預設 equity_cache)
+    :return: 同 exhaustive_equity
+    """
+    cache = cache or equity_cache
+    key, _ = _canonical_groups(hands, board, dead)
+    return cache.get(key, lambda: exhaustive_equity([list(hand) for hand in key[:-2]], list(key[-2]), list(key[-1])))
+
+
+def canonical_hand_type_odds(hands: list, board: list, dead=None, cache=None) -> list:
+    """
+    以正規形式快取的牌型機率與 outs，outs 換回原本的花色
+    :param hands: 各玩家手牌
+    :param board: 已出現的顯牌(3~5張)
+    :param dead: 死牌
+    :param cache: CanonicalCache(預設 outs_cache)
+    :return: 同 hand_type_odds
+    """
+    cache = cache or outs_cache
+    key, permutation_index = _canonical_groups(hands, board, dead)
+    results = cache.get(key, lambda: hand_type_odds([list(hand) for hand in key[:-2]], list(key[-2]), list(key[-1])))
+    return [dict(result, outs=sorted(to_original(result['outs'], permutation_index))) for result in results]
+
+
+if __name__ == '__main__':
+    print('起手牌類別數:', len({canonical_hand(hand) for hand in combinations(range(52), 2)}))
+    print('翻牌類別數:', len(canonical_flops()))
@@ -0,0 +1,228 @@
+"""
+奧馬哈(Omaha)牌力評估
+
+每位玩家 4 張手牌，必須恰好使用 2 張手牌與 3 張顯牌組成五張。
+不逐一評估 C(4,2)×C(5,3)=60 種組合，而是:
+    非同花: 手牌兩張組合以點數多重集合鍵去重，與顯牌點數鍵合併後查表(OMAHA_RANK_STRENGTH)取最大值
+    同花: 只在顯牌某花色達3張且手牌該花色達2張時，才掃描該花色的組合(FLUSH_TABLE)
+"""
+import random
+from itertools import combinations
+from math import comb
+
+from PokerEquity import prepare_cards, tally_showdown, summarize
+from PokerEvaluator import RANK_COUNT_KEY, RANK_STRENGTH, FLUSH_TABLE, encode_cards, evaluate5
+from PokerRule import _convert_poker_type
+from TexasHoldem import strength_hand_type
+
+HOLE_NUM = 4
+_HOLE_PAIRS = tuple(combinations(range(HOLE_NUM), 2))
+# 顯牌張數 => 三張顯牌的索引組合
+_BOARD_TRIPLES = {board_num: tuple(combinations(range(board_num), 3)) for board_num in (3, 4, 5)}
+
+
+# 點數多重集合鍵共 13 個點數 × 3 bits
+_RANK_KEY_BITS = 39
+_BOARD_KEY_MASK = (1 << _RANK_KEY_BITS) - 1
+
+
+class OmahaRankStrengthCache(dict):
+    """
+    (兩張手牌點數鍵, 顯牌點數鍵) => 任取三張顯牌時不計同花的最佳牌力(首次查詢時計算後保存)
+    鍵為 手牌點數鍵 << 39 | 顯牌點數鍵，兩張手牌最多 91 種、顯牌最多 6,175 種點數組合，筆數有上限
+    """
+
+    def __missing__(self, key):
+        pair_key, board_key = key >> _RANK_KEY_BITS, key & _BOARD_KEY_MASK
+        rank_keys = [1 << 3 * rank_index for rank_index in range(13) for _ in range(board_key >> 3 * rank_index & 7)]
+        strength = max(RANK_STRENGTH[pair_key + k0 + k1 + k2] for k0, k1, k2 in set(combinations(rank_keys, 3)))
+        self[key] = strength
+        return strength
+
+
+OMAHA_RANK_STRENGTH = OmahaRankStrengthCache()
+
+
+def _hole_parts(hole_codes) -> (tuple, list):
+    """
+    手牌的兩張組合點數鍵(去重)與各花色的點數位元
+    :return: 點數鍵, [[點數位元, ...] * 4]
+    """
+    pair_keys = tuple({RANK_COUNT_KEY[hole_codes[i0]] + RANK_COUNT_KEY[hole_codes[i1]]
+                       for i0, i1 in combinations(range(len(hole_codes)), 2)})
+    suit_bits = [[], [], [], []]
+    for code in hole_codes:
+        suit_bits[code & 3].append(1 << (code >> 2))
+    return pair_keys, suit_bits
+
+
+def _evaluate_parts(pair_keys, hole_suit_bits, board_codes) -> int:
+    """
+    以預先整理的手牌資料評估牌力
+    :param pair_keys: 手牌兩張組合的點數鍵
+    :param hole_suit_bits: 手牌各花色的點數位元
+    :param board_codes: 顯牌編碼(0~5張)
+    :return: 牌力(int)
+    """
+    board_key = 0
+    suit_counts = [0, 0, 0, 0]
+    for code in board_codes:
+        board_key += RANK_COUNT_KEY[code]
+        suit_counts[code & 3] += 1
+    if len(board_codes) < 3:
+        # 尚不足三張顯牌時，以兩張手牌加上全部顯牌評估
+        return max([RANK_STRENGTH[pair_key + board_key] for pair_key in pair_keys])
+    best = max([OMAHA_RANK_STRENGTH[pair_key << _RANK_KEY_BITS | board_key] for pair_key in pair_keys])
+
+    for suit in range(4):
+        if suit_counts[suit] < 3 or len(hole_suit_bits[suit]) < 2:
+            continue
+        board_bits = [1 << (code >> 2) for code in board_codes if code & 3 == suit]
+        for b0, b1 in combinations(hole_suit_bits[suit], 2):
+            hole_mask = b0 | b1
+            for b2, b3, b4 in combinations(board_bits, 3):
+                strength = FLUSH_TABLE[hole_mask | b2 | b3 | b4]
+                if strength > best:
+                    best = strength
+    return best
+
+
+def evaluate_omaha(hole_codes, board_codes) -> int:
+    """
+    奧馬哈牌力(恰好兩張手牌 + 三張顯牌)
+    :param hole_codes: 4 張手牌編碼
+    :param board_codes: 顯牌編碼(0~5張，不足3張時為兩張手牌加全部顯牌的牌力)
+    :return: 牌力(int)
+    """
+    pair_keys, hole_suit_bits = _hole_parts(hole_codes)
+    return _evaluate_parts(pair_keys, hole_suit_bits, board_codes)
+
+
+class OmahaHandState:
+    """
+    逐街累加的奧馬哈手牌狀態(介面同 HandState)
+    手牌的兩張組合只在建立時整理一次，每次加入顯牌只重新評估顯牌部分
+    :param hole_codes: 手牌編碼
+    :param board_codes: 已出現的顯牌編碼
+    """
+    __slots__ = ('pair_keys', 'hole_suit_bits', 'board_codes', 'strength')
+
+    def __init__(self, hole_codes, board_codes=()):
+        self.pair_keys, self.hole_suit_bits = _hole_parts(list(hole_codes))
+        self.board_codes = []
+        self.strength = 0
+        self.add(board_codes)
+
+    def add(self, codes) -> int:
+        """
+        加入顯牌並更新牌力
+        :param codes: 顯牌編碼
+        :return: 牌力(int)
+        """
+        codes = tuple(codes)
+        if len(self.board_codes) + len(codes) > 5:
+            raise ValueError(f'顯牌最多5張，目前為{len(self.board_codes)}張，加入{len(codes)}張')
+        self.board_codes.extend(codes)
+        self.strength = _evaluate_parts(self.pair_keys, self.hole_suit_bits, self.board_codes)
+        return self.strength
+
+
+def get_best_omaha_hand(hole_cards: list, board_cards: list):
+    """
+    奧馬哈最佳組合
+    :param hole_cards: [PokerCard(),PokerCard(),...] 手牌
+    :param board_cards: [PokerCard(),PokerCard(),...] 顯牌
+    :return: [PokerCard(),PokerCard(),...],str,int
+    """
+    hole_cards = [_convert_poker_type(card) for card in hole_cards]
+    board_cards = [_convert_poker_type(card) for card in board_cards or []]
+    hole_codes = encode_cards(hole_cards)
+    board_codes = encode_cards(board_cards)
+    strength = evaluate_omaha(hole_codes, board_codes)
+    board_picks = combinations(range(len(board_codes)), 3) if len(board_codes) >= 3 else [range(len(board_codes))]
+    for board_pick in board_picks:
+        board_part = [board_codes[index] for index in board_pick]
+        for i0, i1 in combinations(range(len(hole_codes)), 2):
+            codes = [hole_codes[i0], hole_codes[i1]] + board_part
+            if len(codes) == 5:
+                matched = evaluate5(*codes) == strength
+            else:
+                matched = RANK_STRENGTH[sum(RANK_COUNT_KEY[code] for code in codes)] == strength
+            if matched:
+                best_cards = [hole_cards[i0], hole_cards[i1]] + [board_cards[index] for index in board_pick]
+                return sorted(best_cards), strength_hand_type(strength), strength
+    return [], strength_hand_type(strength), strength
+
+
+def evaluate_omaha_batch(holes, boards):
+    """
+    以 NumPy 批次評估奧馬哈牌力(需安裝 numpy)
+    :param holes: (N, 4) 手牌編碼陣列
+    :param boards: (N, 3)~(N, 5) 顯牌編碼陣列
+    :return: 牌力 (N,) int32, 牌型階級 (N,) int32
+    """
+    import numpy as np
+    from PokerBatch import evaluate_batch
+    from PokerEvaluator import STAGE_SHIFT
+
+    holes = np.asarray(holes, dtype=np.int32)
+    boards = np.asarray(boards, dtype=np.int32)
+    if boards.ndim != 2 or boards.shape[1] not in _BOARD_TRIPLES:
+        raise ValueError(f'顯牌陣列形狀必須為 (N, 3)~(N, 5)，目前為{boards.shape}')
+    hole_pairs = holes[:, np.array(_HOLE_PAIRS)]
+    board_triples = boards[:, np.array(_BOARD_TRIPLES[boards.shape[1]])]
+    pair_num, triple_num = hole_pairs.shape[1], board_triples.shape[1]
+    hands = np.concatenate([
+        np.repeat(hole_pairs, triple_num, axis=1),
+        np.tile(board_triples, (1, pair_num, 1)),
+    ], axis=2).reshape(-1, 5)
+    strength = evaluate_batch(hands)[0].reshape(len(holes), pair_num * triple_num).max(axis=1)
+    return strength, strength >> STAGE_SHIFT
+
+
+def _state_strength(state, board_codes: list) -> int:
+    """
+    供 tally_showdown 使用: 以手牌狀態評估完整顯牌
+    """
+    return _evaluate_parts(state.pair_keys, state.hole_suit_bits, board_codes)
+
+
+def omaha_equity(hands: list, board=None, dead=None, trials=100000, seed=None) -> list:
+    """
+    奧馬哈勝率(剩餘顯牌不超過2張時窮舉，否則蒙地卡羅模擬)
+    :param hands: 各玩家 4 張手牌
+    :param board: 已出現的顯牌(0~5張)
+    :param dead: 死牌
+    :param trials: 模擬次數(窮舉時不使用)
+    :param seed: 亂數種子
+    :return: [{"win":float, "tie":float, "equity":float, "ci":(float, float)}, ...]
+    """
+    if trials < 1:
+        raise ValueError(f'模擬次數至少為1，目前為{trials}')
+    hand_codes, board_codes, remaining = prepare_cards(hands, board, dead)
+    for hand in hand_codes:
+        if len(hand) != HOLE_NUM:
+            raise ValueError(f'奧馬哈手牌必須為{HOLE_NUM}張，目前為{len(hand)}張')
+    player_num = len(hand_codes)
+    wins, ties = [0] * player_num, [0] * player_num
+    shares, shares_sq = [0.0] * player_num, [0.0] * player_num
+    # 手牌兩張組合只整理一次，以手牌狀態代替手牌編碼比牌
+    states = [OmahaHandState(hand) for hand in hand_codes]
+    missing = 5 - len(board_codes)
+    if missing <= 2:
+        for runout in combinations(remaining, missing):
+            tally_showdown(states, board_codes + list(runout), wins, ties, shares, shares_sq,
+                           evaluator=_state_strength)
+        return summarize(comb(len(remaining), missing), wins, ties, shares)
+    sample = random.Random(seed).sample
+    for _ in range(trials):
+        tally_showdown(states, board_codes + sample(remaining, missing), wins, ties, shares, shares_sq,
+                       evaluator=_state_strength)
+    return summarize(trials, wins, ties, shares, shares_sq)
+
+
+if __name__ == '__main__':
+    print(get_best_omaha_hand(['p1', 'h1', 'c13', 't12'], ['p13', 'p12', 'h2', 'p3', 'c7']))
+    for player_result in omaha_equity([['p1', 'h1', 'c13', 't12'], ['p10', 'h9', 'c8', 't7']], ['p2', 'h5', 'c9'],
+                                      seed=1):
+        print(player_result)
@@ -0,0 +1,94 @@
+"""
+翻牌、轉牌後的牌型機率與 outs
+
+所有玩家共用同一次剩餘牌的窮舉: 每組發牌只計算一次顯牌的點數多重集合鍵與花色遮罩，
+各玩家再加上自己的手牌查表，不需每位玩家各自窮舉一次
+"""
+from collections import Counter
+from itertools import combinations
+
+from PokerEquity import prepare_cards
+from PokerEvaluator import RANK_COUNT_KEY, RANK_STRENGTH, FLUSH_BEST_TABLE, STAGE_SHIFT
+from TexasHoldem import CardTypeStageEnum
+
+
+def _board_state(codes) -> (int, list, list):
+    """
+    :return: 點數多重集合鍵, 各花色遮罩, 各花色數量
+    """
+    key = 0
+    suit_masks, suit_counts = [0, 0, 0, 0], [0, 0, 0, 0]
+    for code in codes:
+        key += RANK_COUNT_KEY[code]
+        suit_masks[code & 3] |= 1 << (code >> 2)
+        suit_counts[code & 3] += 1
+    return key, suit_masks, suit_counts
+
+
+def _player_stages(hand_keys, hand_suit_masks, board_codes) -> list:
+    """
+    所有玩家在同一組顯牌下的牌型階級
+    """
+    board_key, board_masks, board_counts = _board_state(board_codes)
+    # 兩張手牌要組成同花，顯牌至少需有3張同花色
+    flush_suits = [suit for suit in range(4) if board_counts[suit] >= 3]
+    stages = []
+    for hand_key, suit_masks in zip(hand_keys, hand_suit_masks):
+        strength = RANK_STRENGTH[hand_key + board_key]
+        for suit in flush_suits:
+            flush_strength = FLUSH_BEST_TABLE[suit_masks[suit] | board_masks[suit]]
+            if flush_strength:
+                strength = flush_strength
+        stages.append(strength >> STAGE_SHIFT)
+    return stages
+
+
+def hand_type_odds(hands: list, board: list, dead=None) -> list:
+    """
+    計算各玩家到河牌時各牌型的機率，以及下一張牌能提升目前牌型的 outs
+    未知牌為扣除所有玩家手牌、顯牌與死牌後的剩餘牌
+    :param hands: 各玩家手牌 [['p1', 'h1'], ['c13', 't13'], ...]
+    :param board: 已出現的顯牌(3~5張)
+    :param dead: 死牌
+    :return: [{"hand_type":str, "distribution":{牌型: 機率}, "outs":[卡牌編碼, ...]}, ...]
+    """
+    hand_codes, board_codes, remaining = prepare_cards(hands, board, dead)
+    if len(board_codes) < 3:
+        raise ValueError(f'顯牌至少需3張，目前為{len(board_codes)}張')
+    hand_keys = [_board_state(hand)[0] for hand in hand_codes]
+    hand_suit_masks = [_board_state(hand)[1] for hand in hand_codes]
+    players = range(len(hand_codes))
+
+    current_stages = _player_stages(hand_keys, hand_suit_masks, board_codes)
+    outs = [[] for _ in players]
+    stage_counts = [Counter() for _ in players]
+    missing = 5 - len(board_codes)
+    if missing:
+        # 下一張牌: 提升目前牌型者為 outs
+        for code in remaining:
+            next_stages = _player_stages(hand_keys, hand_suit_masks, board_codes + [code])
+            for index in players:
+                if next_stages[index] > current_stages[index]:
+                    outs[index].append(code)
+                if missing == 1:
+                    stage_counts[index][next_stages[index]] += 1
+    if missing != 1:
+        for runout in combinations(remaining, missing):
+            for index, stage in enumerate(_player_stages(hand_keys, hand_suit_masks, board_codes + list(runout))):
+                stage_counts[index][stage] += 1
+
+    results = []
+    for index in players:
+        total = sum(stage_counts[index].values())
+        results.append({
+            "hand_type": CardTypeStageEnum(current_stages[index]).name,
+            "distribution": {CardTypeStageEnum(stage).name: count / total
+                             for stage, count in sorted(stage_counts[index].items(), reverse=True)},
+            "outs": outs[index],
+        })
+    return results
+
+
+if __name__ == '__main__':
+    for player_result in hand_type_odds([['p1', 'h1'], ['c13', 'c12']], board=['p13', 'c7', 'c2']):
+        print(player_result)
@@ -0,0 +1,157 @@
+"""
+翻牌前 169 種起手牌勝率表
+
+起手牌依點數與是否同花歸為 169 類(對子、同花、不同花)，
+預先計算對上 1~9 位隨機對手的勝率並存成二進位檔，載入時以 mmap 映射，查詢為 O(1)
+"""
+import mmap
+import os
+import struct
+from array import array
+
+from PokerEvaluator import encode_cards
+from PokerSharedTables import attach_shared_buffer
+
+RANK_CHARS = '23456789TJQKA'
+HAND_CLASS_NUM = 169
+MAX_OPPONENTS = 9
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.bin')
+# 檔頭: 識別碼、起手牌類別數、最大對手數 (其後為本機位元組序的 float32 陣列)
+_HEADER = struct.Struct('<4sHH')
+_MAGIC = b'PFEQ'
+
+_table = None
+
+
+def hand_class_index(hand) -> int:
+    """
+    起手牌類別索引(13x13 格: 對子在對角線，同花為 大*13+小，不同花為 小*13+大)
+    :param hand: 兩張手牌(Player.show_hand() 的輸出、'p5' 寫法、PokerCard 或卡牌編碼)
+    :return: 0 ~ 168
+    """
+    first, second = encode_cards(hand)
+    high, low = max(first >> 2, second >> 2), min(first >> 2, second >> 2)
+    if (first & 3) == (second & 3):
+        return high * 13 + low
+    return low * 13 + high
+
+
+def hand_class_name(index: int) -> str:
+    """
+    起手牌類別名稱，例: 'AA'、'AKs'、'T9o'
+    :param index: 起手牌類別索引
+    :return: str
+    """
+    row, column = divmod(index, 13)
+    if row == column:
+        return RANK_CHARS[row] * 2
+    if row > column:
+        return f'{RANK_CHARS[row]}{RANK_CHARS[column]}s'
+    return f'{RANK_CHARS[column]}{RANK_CHARS[row]}o'
+
+
+def _representative_hand(index: int) -> list:
+    """
+    類別的代表手牌編碼
+    """
+    row, column = divmod(index, 13)
+    if row == column:
+        return [row << 2, row << 2 | 1]
+    if row > column:
+        return [row << 2, column << 2]
+    return [column << 2, row << 2 | 1]
+
+
+def build_preflop_table(trials=20000, seed=0, max_opponents=MAX_OPPONENTS) -> array:
+    """
+    以 NumPy 批次評估模擬產生勝率表(需安裝 numpy)
+    每次模擬同時抽出最多對手的手牌與五張顯牌，前 k 位對手即為對上 k 人的結果
+    :param trials: 每類起手牌的模擬次數
+    :param seed: 亂數種子
+    :param max_opponents: 最大對手數
+    :return: array('f')，長度 169 * max_opponents
+    """
+    import numpy as np
+    from PokerBatch import evaluate_batch
+
+    rng = np.random.default_rng(seed)
+    table = array('f', [0.0] * (HAND_CLASS_NUM * max_opponents))
+    draw_num = max_opponents * 2 + 5
+    for index in range(HAND_CLASS_NUM):
+        hand = _representative_hand(index)
+        remaining = np.array([code for code in range(52) if code not in hand], dtype=np.int32)
+        draws = remaining[np.argsort(rng.random((trials, len(remaining))), axis=1)[:, :draw_num]]
+        board = draws[:, -5:]
+        hero_strength, _ = evaluate_batch(np.hstack([np.tile(hand, (trials, 1)), board]))
+        opponent_cards = draws[:, :max_opponents * 2].reshape(trials, max_opponents, 2)
+        opponent_board = np.repeat(board[:, None, :], max_opponents, axis=1)
+        opponent_strength, _ = evaluate_batch(
+            np.concatenate([opponent_cards, opponent_board], axis=2).reshape(-1, 7))
+        opponent_strength = opponent_strength.reshape(trials, max_opponents)
+        for opponents in range(1, max_opponents + 1):
+            field = opponent_strength[:, :opponents]
+            best = field.max(axis=1)
+            tie_num = (field == hero_strength[:, None]).sum(axis=1)
+            share = np.where(hero_strength > best, 1.0,
+                             np.where(hero_strength == best, 1.0 / (tie_num + 1), 0.0))
+            table[index * max_opponents + opponents - 1] = float(share.mean())
+    return table
+
+
+def save_preflop_table(table: array, path=DEFAULT_TABLE_PATH, max_opponents=MAX_OPPONENTS):
+    """
+    寫入勝率表二進位檔
+    :param table: build_preflop_table 的結果
+    :param path: 檔案路徑
+    :param max_opponents: 最大對手數
+    :return:
+    """
+    with open(path, 'wb') as file:
+        file.write(_HEADER.pack(_MAGIC, HAND_CLASS_NUM, max_opponents))
+        table.tofile(file)
+
+
+def load_preflop_table(path=DEFAULT_TABLE_PATH, build_if_missing=True):
+    """
+    以 mmap 載入勝率表，檔案不存在時產生後寫入磁碟快取
+    行程設定了共享查表時改為映射共享檔
+    :param path: 檔案路徑
+    :param build_if_missing: 檔案不存在時是否重新產生
+    :return: (memoryview(float32), 最大對手數)
+    """
+    mapped = attach_shared_buffer(path)
+    if mapped is None:
+        if not os.path.exists(path):
+            if not build_if_missing:
+                raise FileNotFoundError(f'找不到翻牌前勝率表: {path}')
+            save_preflop_table(build_preflop_table(), path)
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, hand_class_num, max_opponents = _HEADER.unpack_from(mapped)
+    if magic != _MAGIC or hand_class_num != HAND_CLASS_NUM:
+        raise ValueError(f'翻牌前勝率表格式錯誤: {path}')
+    return memoryview(mapped)[_HEADER.size:].cast('f'), max_opponents
+
+
+def preflop_equity(hand, opponents=1) -> float:
+    """
+    查詢起手牌對上隨機對手的勝率
+    :param hand: 兩張手牌(可直接使用 Player.show_hand() 的輸出)
+    :param opponents: 對手人數(1~9)
+    :return: float
+    """
+    global _table
+    if _table is None:
+        _table = load_preflop_table()
+    values, max_opponents = _table
+    if opponents < 1 or opponents > max_opponents:
+        raise ValueError(f'對手人數必須介於1~{max_opponents}之間，opponents={opponents}')
+    return values[hand_class_index(hand) * max_opponents + opponents - 1]
+
+
+if __name__ == '__main__':
+    save_preflop_table(build_preflop_table())
+    for class_index in range(HAND_CLASS_NUM):
+        print(hand_class_name(class_index), [round(preflop_equity(_representative_hand(class_index), num), 3)
+                                             for num in range(1, MAX_OPPONENTS + 1)])
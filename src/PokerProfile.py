@@ -0,0 +1,220 @@
+"""
+熱點量測
+
+enable() 時才以計時包裝函式替換評估器、牌組操作與牌局階段的函式，disable() 後還原為原函式，
+未啟用時完全沒有額外開銷。另提供 cProfile 與 sys.setprofile 的量測輔助
+"""
+import cProfile
+import importlib
+import inspect
+import io
+import os
+import pstats
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+
+# 預設量測目標: '模組.函式' 或 '模組.類別.方法'(含 property、staticmethod)
+DEFAULT_TARGETS = (
+    'PokerEvaluator.evaluate5',
+    'PokerEvaluator.evaluate7',
+    'PokerEvaluator.evaluate',
+    'PokerEvaluator.evaluate_best',
+    'PokerEvaluator.HandState.add',
+    'PokerRule.PokerGroup.fill_card_group',
+    'PokerRule.PokerGroup.shuffle',
+    'PokerRule.PokerGroup.draw',
+    'PokerRule.PokerGroup.add',
+    'TexasHoldem.TexasRule.list_sort',
+    'TexasHoldem.TexasRule.judge_kinds',
+    'TexasHoldem.TexasRule.check',
+    'TexasHoldem.get_biggest_stack_type',
+    'TexasHoldem.get_best_hand',
+    'TexasHoldem.judge_winner',
+    'poker_test.ClassicPokerGame.C_function',
+    'poker_test.ClassicPokerGame.game_start',
+    'poker_test.ClassicPokerGame.deal_all',
+    'poker_test.ClassicPokerGame.add_appear_card',
+    'poker_test.ClassicPokerGame.judge_player_winnable',
+)
+
+_SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 名稱 => [呼叫次數, 累計秒數]
+stats = {}
+# 已替換的目標: [(擁有者, 屬性名稱, 原物件), ...]
+_patched = []
+
+
+def _timed(name: str, func):
+    record = stats.setdefault(name, [0, 0.0])
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record[0] += 1
+            record[1] += perf_counter() - start
+
+    return wrapper
+
+
+def _replace(owner, attr: str, original, replacement):
+    setattr(owner, attr, replacement)
+    _patched.append((owner, attr, original))
+
+
+def _patch_target(target: str):
+    module_name, _, path = target.partition('.')
+    module = importlib.import_module(module_name)
+    owner_name, _, attr = path.rpartition('.')
+    if owner_name:
+        owner = getattr(module, owner_name)
+        original = inspect.getattr_static(owner, attr)
+        if isinstance(original, property):
+            replacement = property(_timed(target, original.fget), original.fset, original.fdel, original.__doc__)
+        elif isinstance(original, staticmethod):
+            replacement = staticmethod(_timed(target, original.__func__))
+        elif isinstance(original, classmethod):
+            replacement = classmethod(_timed(target, original.__func__))
+        else:
+            replacement = _timed(target, original)
+        _replace(owner, attr, original, replacement)
+        return
+    original = getattr(module, attr)
+    replacement = _timed(target, original)
+    # 以 from ... import 取得同一函式的專案模組也一併替換
+    for loaded in list(sys.modules.values()):
+        module_file = getattr(loaded, '__file__', None)
+        if not module_file or os.path.dirname(os.path.abspath(module_file)) != _SOURCE_DIR:
+            continue
+        for name, value in list(vars(loaded).items()):
+            if value is original:
+                _replace(loaded, name, original, replacement)
+
+
+def enable(targets=DEFAULT_TARGETS):
+    """
+    開始量測(重複呼叫不會重複包裝)
+    :param targets: 量測目標
+    :return:
+    """
+    if _patched:
+        return
+    for target in targets:
+        _patch_target(target)
+
+
+def disable():
+    """
+    停止量測並還原原函式(保留已累計的數據)
+    :return:
+    """
+    while _patched:
+        owner, attr, original = _patched.pop()
+        setattr(owner, attr, original)
+
+
+def is_enabled() -> bool:
+    return bool(_patched)
+
+
+def reset():
+    """
+    清空累計數據
+    :return:
+    """
+    for record in stats.values():
+        record[0] = 0
+        record[1] = 0.0
+
+
+@contextmanager
+def profiling(targets=DEFAULT_TARGETS):
+    """
+    with profiling(): ... 區塊內啟用量測
+    """
+    enable(targets)
+    try:
+        yield stats
+    finally:
+        disable()
+
+
+def report(limit=None) -> str:
+    """
+    依累計時間排序的量測報表(巢狀呼叫的時間會同時計入外層)
+    :param limit: 顯示筆數
+    :return: str
+    """
+    rows = sorted(((name, calls, total) for name, (calls, total) in stats.items() if calls),
+                  key=lambda row: row[2], reverse=True)
+    lines = [f'{"函式":<48}{"次數":>10}{"累計秒數":>12}{"每次(µs)":>12}{"每秒次數":>14}']
+    for name, calls, total in rows[:limit]:
+        per_sec = calls / total if total else float('inf')
+        lines.append(f'{name:<48}{calls:>10,}{total:>12.4f}{total / calls * 1e6:>12.2f}{per_sec:>14,.0f}')
+    return '\n'.join(lines)
+
+
+def cprofile_run(func, *args, sort='cumulative', limit=20, **kwargs) -> (object, str):
+    """
+    以 cProfile 執行函式
+    :param func: 要執行的函式
+    :param sort: pstats 排序欄位
+    :param limit: 顯示筆數
+    :return: 函式回傳值, pstats 報表
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(limit)
+    return result, output.getvalue()
+
+
+def count_calls(func, *args, **kwargs) -> (object, Counter):
+    """
+    以 sys.setprofile 計算執行期間專案內各函式的呼叫次數(不需替換函式)
+    :param func: 要執行的函式
+    :return: 函式回傳值, Counter({'檔名:函式名稱': 次數})
+    """
+    counts = Counter()
+
+    def tracer(frame, event, arg):
+        if event == 'call':
+            code = frame.f_code
+            if os.path.dirname(os.path.abspath(code.co_filename)) == _SOURCE_DIR:
+                counts[f'{os.path.basename(code.co_filename)}:{code.co_name}'] += 1
+
+    previous = sys.getprofile()
+    sys.setprofile(tracer)
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        sys.setprofile(previous)
+    return result, counts
+
+
+if __name__ == '__main__':
+    import random
+    from poker_test import ClassicPokerGame, Player
+
+    def simulate(games=200, player_num=10):
+        game = ClassicPokerGame(_players=[Player(f'Player_{num}') for num in range(1, player_num + 1)],
+                                rng=random.Random(0))
+        for _ in range(games):
+            game.reset()
+            game.game_start()
+            game.deal_all()
+            game.judge_player_winnable()
+            for add_num in (3, 1, 1):
+                game.add_appear_round(add_num)
+
+    with profiling():
+        simulate()
+    print(report())
+    print(cprofile_run(simulate, limit=15)[1])
+    print(count_calls(simulate, 20)[1].most_common(15))
@@ -0,0 +1,310 @@
+"""
+手牌範圍與範圍對範圍勝率(需安裝 numpy)
+
+範圍寫法: 'QQ+, AKs, ATo+, 76s, 22-55, A5s-A2s, KQ, AJs:0.5'
+  QQ+      QQ 以上的對子          22-55    22 到 55 的對子
+  AKs/AKo  同花/不同花(不寫為兩者)  ATo+     AT 到 AQ 的不同花
+  A5s-A2s  同一大牌、踢腳介於兩者間  :0.5     該組合的權重(預設1)
+每組起手牌展開為具體的兩張卡牌編碼(combo)，以卡牌編碼計算勝率
+"""
+import random
+from collections import OrderedDict
+from itertools import combinations
+from math import sqrt
+
+import numpy as np
+
+from PokerBatch import evaluate_batch
+from PokerEquity import Z_95
+from PokerEvaluator import encode_cards
+from PokerPreflop import RANK_CHARS
+
+# 全部 1326 組兩張牌與其索引
+ALL_COMBOS = tuple(combinations(range(52), 2))
+COMBO_INDEX = {combo: index for index, combo in enumerate(ALL_COMBOS)}
+_COMBO_ARRAY = np.array(ALL_COMBOS, dtype=np.int32)
+_COMBO_MASKS = np.array([1 << first | 1 << second for first, second in ALL_COMBOS], dtype=np.int64)
+
+
+def _rank_index(char: str) -> int:
+    index = RANK_CHARS.find(char.upper())
+    if index < 0:
+        raise ValueError(f'不存在的點數: {char}')
+    return index
+
+
+def _pair_combos(rank: int) -> list:
+    return [(rank << 2 | first, rank << 2 | second) for first, second in combinations(range(4), 2)]
+
+
+def _non_pair_combos(high: int, low: int, suited) -> list:
+    """
+    :param suited: True 同花、False 不同花、None 兩者
+    """
+    combos = []
+    for high_suit in range(4):
+        for low_suit in range(4):
+            if suited is not None and (high_suit == low_suit) != suited:
+                continue
+            combos.append(tuple(sorted((high << 2 | high_suit, low << 2 | low_suit))))
+    return combos
+
+
+def _parse_hand(text: str) -> (int, int, object):
+    """
+    解析單一起手牌 'AKs'
+    :return: 大牌索引, 小牌索引, 是否同花(None 為兩者)
+    """
+    if len(text) not in (2, 3):
+        raise ValueError(f'無法解析的起手牌: {text}')
+    first, second = _rank_index(text[0]), _rank_index(text[1])
+    suffix = text[2:].lower()
+    if suffix not in ('', 's', 'o'):
+        raise ValueError(f'無法解析的起手牌: {text}')
+    if first == second and suffix:
+        raise ValueError(f'對子不能指定同花/不同花: {text}')
+    suited = {'': None, 's': True, 'o': False}[suffix]
+    return max(first, second), min(first, second), suited
+
+
+def _expand_token(token: str) -> list:
+    """
+    展開單一範圍寫法為 combo
+    """
+    if '-' in token:
+        start, end = (part.strip() for part in token.split('-'))
+        start_high, start_low, start_suited = _parse_hand(start)
+        end_high, end_low, end_suited = _parse_hand(end)
+        if start_suited != end_suited:
+            raise ValueError(f'範圍兩端的同花設定不同: {token}')
+        if start_high == start_low and end_high == end_low:
+            ranks = range(min(start_high, end_high), max(start_high, end_high) + 1)
+            return [combo for rank in ranks for combo in _pair_combos(rank)]
+        if start_high != end_high or start_high == start_low or end_high == end_low:
+            raise ValueError(f'範圍兩端必須為相同大牌: {token}')
+        lows = range(min(start_low, end_low), max(start_low, end_low) + 1)
+        return [combo for low in lows for combo in _non_pair_combos(start_high, low, start_suited)]
+
+    plus = token.endswith('+')
+    high, low, suited = _parse_hand(token[:-1] if plus else token)
+    if high == low:
+        ranks = range(high, len(RANK_CHARS)) if plus else [high]
+        return [combo for rank in ranks for combo in _pair_combos(rank)]
+    lows = range(low, high) if plus else [low]
+    return [combo for kicker in lows for combo in _non_pair_combos(high, kicker, suited)]
+
+
+class HandRange:
+    """
+    手牌範圍
+    :param combos: {(卡牌編碼, 卡牌編碼): 權重}
+    """
+
+    def __init__(self, combos=None):
+        self.combos = dict(combos or {})
+
+    @classmethod
+    def parse(cls, text: str):
+        """
+        解析範圍寫法，同一 combo 重複出現時以後者的權重為準
+        :param text: 'QQ+, AKs, ATo+, 76s'
+        :return: HandRange
+        """
+        combos = {}
+        for token in text.replace(' ', '').split(','):
+            if not token:
+                continue
+            weight = 1.0
+            if ':' in token:
+                token, weight_text = token.split(':', 1)
+                weight = float(weight_text)
+                if not 0 <= weight <= 1:
+                    raise ValueError(f'權重必須介於0~1之間: {weight_text}')
+            for combo in _expand_token(token):
+                combos[combo] = weight
+        return cls(combos)
+
+    def remove_cards(self, cards):
+        """
+        移除與指定牌(顯牌、死牌)重複的 combo
+        :param cards: 卡牌('p5' 寫法、PokerCard 或卡牌編碼)
+        :return: 新的 HandRange
+        """
+        removed = set(encode_cards(cards))
+        return HandRange({combo: weight for combo, weight in self.combos.items()
+                          if combo[0] not in removed and combo[1] not in removed})
+
+    def __len__(self):
+        return len(self.combos)
+
+    def __iter__(self):
+        return iter(self.combos.items())
+
+    @property
+    def total_weight(self) -> float:
+        return sum(self.combos.values())
+
+    def arrays(self) -> (np.ndarray, np.ndarray):
+        """
+        :return: combo 索引 (n,), 權重 (n,)
+        """
+        items = [(COMBO_INDEX[combo], weight) for combo, weight in self.combos.items() if weight > 0]
+        return (np.array([index for index, _ in items], dtype=np.int64),
+                np.array([weight for _, weight in items], dtype=np.float64))
+
+
+class BoardStrengthCache:
+    """
+    以完整五張顯牌為鍵，快取全部 1326 組手牌在該顯牌下的牌力(與顯牌重複的 combo 為-1)
+    不同的查詢(範圍或翻牌、轉牌)只要走到相同的完整顯牌即可共用
+    :param maxsize: LRU 最多保留的顯牌數
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def strengths(self, boards: list, chunk_size=128) -> np.ndarray:
+        """
+        取得多組顯牌的 combo 牌力
+        :param boards: [[五張卡牌編碼], ...]
+        :param chunk_size: 每次批次評估的顯牌數
+        :return: (len(boards), 1326) int32
+        """
+        masks = []
+        found = {}
+        missing = OrderedDict()
+        for board in boards:
+            mask = 0
+            for code in board:
+                mask |= 1 << code
+            masks.append(mask)
+            if mask in found or mask in missing:
+                continue
+            board_strength = self._entries.get(mask)
+            if board_strength is not None:
+                self.hits += 1
+                self._entries.move_to_end(mask)
+                found[mask] = board_strength
+            else:
+                self.misses += 1
+                missing[mask] = board
+        pending = list(missing.items())
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            board_array = np.array([board for _, board in chunk], dtype=np.int32)
+            cards = np.concatenate([
+                np.broadcast_to(_COMBO_ARRAY, (len(chunk), len(ALL_COMBOS), 2)),
+                np.broadcast_to(board_array[:, None, :], (len(chunk), len(ALL_COMBOS), 5)),
+            ], axis=2).reshape(-1, 7)
+            strength, _ = evaluate_batch(cards)
+            strength = strength.reshape(len(chunk), len(ALL_COMBOS))
+            for row, (mask, _) in enumerate(chunk):
+                board_strength = strength[row].copy()
+                board_strength[(_COMBO_MASKS & mask) != 0] = -1
+                found[mask] = board_strength
+                self._entries[mask] = board_strength
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return np.stack([found[mask] for mask in masks])
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+default_board_cache = BoardStrengthCache()
+
+
+def _as_range(hand_range) -> HandRange:
+    return hand_range if isinstance(hand_range, HandRange) else HandRange.parse(hand_range)
+
+
+def range_equity(hero, villain, board=None, dead=None, trials=1000, seed=None, cache=None) -> list:
+    """
+    範圍對範圍勝率
+    剩餘顯牌不超過2張時窮舉全部發牌，否則隨機抽出 trials 組顯牌；
+    每組顯牌下以全部 combo 配對比較，與對方或顯牌重複的配對不計入，權重為雙方 combo 權重相乘
+    :param hero: 範圍(HandRange 或範圍寫法)
+    :param villain: 範圍(HandRange 或範圍寫法)
+    :param board: 已出現的顯牌(0~5張)
+    :param dead: 死牌
+    :param trials: 隨機抽出的顯牌組數
+    :param seed: 亂數種子
+    :param cache: BoardStrengthCache(預設共用模組快取)
+    :return: [{"win":float, "tie":float, "equity":float, "ci":(float, float), "combos":int}, ...]
+    """
+    cache = cache or default_board_cache
+    board_codes = encode_cards(board or [])
+    dead_codes = encode_cards(dead or [])
+    if len(board_codes) > 5:
+        raise ValueError(f'顯牌最多5張，目前為{len(board_codes)}張')
+    known = board_codes + dead_codes
+    if len(set(known)) != len(known):
+        raise ValueError('顯牌與死牌之間有重複的牌')
+    ranges = [_as_range(hand_range).remove_cards(known) for hand_range in (hero, villain)]
+    (hero_index, hero_weight), (villain_index, villain_weight) = (hand_range.arrays() for hand_range in ranges)
+    if not len(hero_index) or not len(villain_index):
+        raise ValueError('範圍移除顯牌與死牌後沒有任何組合')
+
+    # 雙方 combo 不重複的配對權重
+    disjoint = (_COMBO_MASKS[hero_index][:, None] & _COMBO_MASKS[villain_index][None, :]) == 0
+    pair_weight = hero_weight[:, None] * villain_weight[None, :] * disjoint
+
+    known_set = set(known)
+    deck = [code for code in range(52) if code not in known_set]
+    missing = 5 - len(board_codes)
+    exhaustive = missing <= 2
+    if exhaustive:
+        boards = [board_codes + list(runout) for runout in combinations(deck, missing)]
+    else:
+        rng = random.Random(seed)
+        boards = [board_codes + rng.sample(deck, missing) for _ in range(trials)]
+
+    hero_win = villain_win = tie = total = 0.0
+    board_equities = []
+    chunk_size = max(1, 2000000 // pair_weight.size)
+    for start in range(0, len(boards), chunk_size):
+        strengths = cache.strengths(boards[start:start + chunk_size])
+        hero_strength = strengths[:, hero_index][:, :, None]
+        villain_strength = strengths[:, villain_index][:, None, :]
+        weight = pair_weight * ((hero_strength >= 0) & (villain_strength >= 0))
+        board_total = weight.sum(axis=(1, 2))
+        board_hero_win = (weight * (hero_strength > villain_strength)).sum(axis=(1, 2))
+        board_tie = (weight * (hero_strength == villain_strength)).sum(axis=(1, 2))
+        total += board_total.sum()
+        hero_win += board_hero_win.sum()
+        tie += board_tie.sum()
+        villain_win += (board_total - board_hero_win - board_tie).sum()
+        if not exhaustive:
+            valid = board_total > 0
+            board_equities.extend(((board_hero_win + board_tie / 2)[valid] / board_total[valid]).tolist())
+    if not total:
+        raise ValueError('雙方範圍沒有可成立的配對')
+
+    hero_win, villain_win, tie, total = float(hero_win), float(villain_win), float(tie), float(total)
+    hero_equity = (hero_win + tie / 2) / total
+    margin = 0.0
+    if not exhaustive and len(board_equities) > 1:
+        samples = np.array(board_equities)
+        margin = Z_95 * float(samples.std(ddof=1)) / sqrt(len(samples))
+    results = []
+    for win, equity, hand_range in ((hero_win, hero_equity, ranges[0]), (villain_win, 1 - hero_equity, ranges[1])):
+        results.append({
+            "win": win / total,
+            "tie": tie / total,
+            "equity": equity,
+            "ci": (max(equity - margin, 0.0), min(equity + margin, 1.0)),
+            "combos": len(hand_range),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    for player_result in range_equity('QQ+, AKs, AKo', 'ATo+, 76s, 22-55', trials=500, seed=1):
+        print(player_result)
+    for player_result in range_equity('QQ+, AKs', 'ATo+, 76s', board=['p13', 'h7', 'c2']):
+        print(player_result)
@@ -1,4 +1,9 @@
 import random
+from array import array
+
+# 牌組使用的數字: 標準 52 張與短牌(6+) 36 張(2~5 移除)
+FULL_DECK_NUMBERS = tuple(range(1, 14))
+SHORT_DECK_NUMBERS = (1,) + tuple(range(6, 14))
 
 
 class PokerDefinition:
@@ -6,13 +11,15 @@ class PokerDefinition:
     撲克定義
     :param displacement: 位移權重(代表以哪個數值為起始，預設為8 => 梅花2為起點
     """
+    __slots__ = ('_displacement',)
+
+    # 分類(所有實例共用)
+    _type_limit = ('p', 'h', 'c', 't')
+    _type_img = ('♠', '♥', '♦', '♣')
+    _type_text = ('黑桃', '紅心', '方塊', '梅花')
 
     def __init__(self, displacement=4):
-        # 分類
         self._displacement = displacement
-        self._type_limit = ['p', 'h', 'c', 't']
-        self._type_img = ['♠', '♥', '♦', '♣']
-        self._type_text = ['黑桃', '紅心', '方塊', '梅花']
 
     def poker_enum(self, _type, _return='img'):
         if _return == 'text':
@@ -42,58 +49,99 @@ class PokerCard(PokerDefinition):
     紅心♥（h）、方塊♦（c)
     :param _number: 數字(1~13)
 
+    52 張牌各只有一個實例(享元)，建立後不可修改，
+    PokerCard('p', 5) 與 check_poker_type('p5') 會回傳同一個物件
+    code 為卡牌整數編碼: (點數 - 2) << 2 | 花色索引 (A 視為 14)，範圍 0~51
     """
+    __slots__ = ('_number', '_type', '_color', '_value', '_text', '_img', '_locale_text', '_code')
 
-    def __init__(self, _type: str, _number: int):
-        super().__init__()
-        if _type not in self._type_limit:
-            raise TypeError(f'類型錯誤，只能是這些字母{self._type_limit}類型，_type={_type}')
+    _cache = {}
+
+    def __new__(cls, _type: str, _number: int):
+        card = cls._cache.get((_type, _number))
+        if card is not None:
+            return card
+        if _type not in cls._type_limit:
+            raise TypeError(f'類型錯誤，只能是這些字母{cls._type_limit}類型，_type={_type}')
         if _number < 1 or _number > 13:
             raise TypeError(f'類型錯誤，數字大小必須介於1~13之間，_number={_number}')
 
-        self._number = _number
-        self._type = _type
-        if _type == 'p' or _type == 't':
-            self._color = 'black'
-        else:
-            self._color = 'red'
+        card = super().__new__(cls)
+        type_index = cls._type_limit.index(_type)
+        displacement = 4
+        value = _number * 4 - type_index - displacement
+        if value <= 0:
+            value = value + 48 + displacement
+        for name, attr_value in (
+                ('_displacement', displacement),
+                ('_number', _number),
+                ('_type', _type),
+                ('_color', 'black' if _type == 'p' or _type == 't' else 'red'),
+                ('_value', value),
+                ('_text', f'{_type}{_number}'),
+                ('_img', f'{cls._type_img[type_index]}{_number}'),
+                ('_locale_text', f'{cls._type_text[type_index]}{_number}'),
+                ('_code', (12 if _number == 1 else _number - 2) << 2 | type_index),
+        ):
+            object.__setattr__(card, name, attr_value)
+        cls._cache[(_type, _number)] = card
+        return card
+
+    def __init__(self, _type: str, _number: int):
+        # 屬性已於 __new__ 建立
+        pass
+
+    def __setattr__(self, key, value):
+        raise AttributeError('PokerCard 建立後不可修改')
+
+    def __delattr__(self, key):
+        raise AttributeError('PokerCard 建立後不可修改')
+
+    def __reduce__(self):
+        return PokerCard, (self._type, self._number)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     # 比較運算符定義
     def __lt__(self, other):
-        return self.value < other.value
+        return self._value < other.value
 
     def __le__(self, other):
-        return self.value <= other.value
+        return self._value <= other.value
 
     def __eq__(self, other):
-        return self.value == other.value
+        return self._value == other.value
 
     def __gt__(self, other):
-        return self.value > other.value
+        return self._value > other.value
 
     def __ge__(self, other):
-        return self.value >= other.value
+        return self._value >= other.value
 
     def __repr__(self):
-        return str(self.img)
+        return self._img
 
     def __add__(self, other):
         if isinstance(other, PokerCard):
-            return self.value + other.value
+            return self._value + other.value
         else:
             raise TypeError('PokerCard型別只能跟PokerCard相加')
 
     def __iadd__(self, other):
         if isinstance(other, PokerCard):
-            return self.value + other.value
+            return self._value + other.value
         else:
             raise TypeError('PokerCard型別只能跟PokerCard相加')
 
     def __int__(self):
-        return self.value
+        return self._value
 
     def __hash__(self):
-        return self.value
+        return self._value
 
     def __getitem__(self, key):
         if key == 'color':
@@ -103,9 +151,9 @@ class PokerCard(PokerDefinition):
         elif key == 'number':
             return self._number
         elif key == 'value':
-            return self.value
+            return self._value
         elif key == ' text':
-            return self.text
+            return self._text
         else:
             raise TypeError(f'不存在{key}屬性，請用value or number')
 
@@ -123,31 +171,68 @@ class PokerCard(PokerDefinition):
 
     @property
     def value(self):
-        cal = self._number * 4 - self._type_limit.index(self._type) - self._displacement
-        if cal <= 0:
-            cal = cal + 48 + self._displacement
-        return cal
+        return self._value
 
     @property
     def text(self):
-        return f'{self._type}{self._number}'
+        return self._text
 
     @property
     def locale_text(self):
-        return f'{super().poker_enum(self._type, "text")}{self._number}'
+        return self._locale_text
 
     @property
     def img(self):
-        return f'{super().poker_enum(self._type, "img")}{self._number}'
+        return self._img
+
+    @property
+    def code(self):
+        return self._code
+
+
+_EMPTY_POSITION = array('i', [-1] * 52)
 
 
 class PokerGroup(PokerDefinition):
-    def __init__(self, initial_card=None, quantity=52):
+    """
+    卡牌組
+    以 52 位元的遮罩記錄牌組內有哪些牌，並以卡牌編碼陣列記錄由上到下的順序，
+    抽牌、指定抽牌、加入與查詢是否存在皆為 O(1)；同一張牌在牌組中只會存在一次
+    :param initial_card: 初始卡牌
+    :param quantity: 牌組張數
+    :param rng: 洗牌使用的亂數產生器(需有 shuffle 方法，預設為 random 模組)
+    :param short_deck: 短牌(6+)牌組，fill_card_group 只放入 A、6~K 共 36 張
+    """
+
+    def __init__(self, initial_card=None, quantity=None, rng=None, short_deck=False):
         super().__init__()
-        if initial_card is None:
-            initial_card = []
-        self.card_list = initial_card
-        self.quantity = quantity
+        self.short_deck = short_deck
+        self._numbers = SHORT_DECK_NUMBERS if short_deck else FULL_DECK_NUMBERS
+        self.quantity = quantity or len(self._type_limit) * len(self._numbers)
+        self._rng = rng or random
+        self._clear()
+        if initial_card:
+            self.add(initial_card)
+
+    def _clear(self):
+        # 卡牌編碼順序(由上到下)，被移除的牌不會立即從陣列刪除，以 _position 判斷是否有效
+        self._order = array('b')
+        self._top = 0
+        # 各卡牌編碼在 _order 中的有效位置(-1 代表不在牌組內)
+        self._position = array('i', _EMPTY_POSITION)
+        self._mask = 0
+        self._size = 0
+
+    def clear(self):
+        """
+        清空牌組(沿用既有陣列，不重新配置記憶體)
+        :return:
+        """
+        del self._order[:]
+        self._position[:] = _EMPTY_POSITION
+        self._top = 0
+        self._mask = 0
+        self._size = 0
 
     @staticmethod
     def check_poker_type(card):
@@ -160,34 +245,130 @@ class PokerGroup(PokerDefinition):
             except Exception:
                 ValueError('格式錯誤,請使用PokerCard class 或是 "p5","t3"寫法')
 
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, card):
+        card = self.check_poker_type(card)
+        return card is not None and bool(self._mask >> card.code & 1)
+
+    @property
+    def mask(self):
+        """
+        牌組的 52 位元遮罩(第 code 位元代表該牌存在)
+        :return: int
+        """
+        return self._mask
+
+    @property
+    def codes(self):
+        """
+        由上到下的卡牌編碼
+        :return: [int,...]
+        """
+        position = self._position
+        return [code for index, code in enumerate(self._order[self._top:], self._top) if position[code] == index]
+
+    @property
+    def card_list(self):
+        """
+        由上到下的卡牌(依遮罩與編碼即時產生的 tuple，原地修改不會影響牌組，
+        請改用 add、draw 或直接指定 card_list)
+        :return: (PokerCard(),...)
+        """
+        return tuple(_CARD_BY_CODE[code] for code in self.codes)
+
+    @card_list.setter
+    def card_list(self, card_list):
+        self._clear()
+        self.add(card_list)
+
+    def _push(self, code):
+        """
+        將卡牌編碼放到牌組底部
+        """
+        if len(self._order) >= 2 * 52:
+            self._compact()
+        self._position[code] = len(self._order)
+        self._order.append(code)
+        self._mask |= 1 << code
+        self._size += 1
+
+    def _remove(self, code):
+        self._position[code] = -1
+        self._mask &= ~(1 << code)
+        self._size -= 1
+
+    def _compact(self):
+        """
+        移除陣列中已失效的位置
+        """
+        codes = self.codes
+        self._order = array('b', codes)
+        self._top = 0
+        for index, code in enumerate(codes):
+            self._position[code] = index
+
     def content(self, as_class=False):
         """
         回傳目前牌組情況
         :return:
         """
-        if not self.card_list:
+        if not self._size:
             return None
         if as_class:
-            return self.card_list
+            return [_CARD_BY_CODE[code] for code in self.codes]
         else:
-            return list(map(lambda x: x.img, self.card_list))
+            return [_CARD_BY_CODE[code].img for code in self.codes]
 
     def fill_card_group(self, is_shuffle=True):
         for _type in self._type_limit:
-            for num in range(1, 14):
-                card = PokerCard(_type=_type, _number=num)
-                self.card_list.append(card)
+            for num in self._numbers:
+                code = PokerCard(_type=_type, _number=num).code
+                if not self._mask >> code & 1:
+                    self._push(code)
         if is_shuffle:
-            for i in range(0, self.quantity):
-                self.shuffle()
+            self.shuffle()
 
     def shuffle(self, is_show=False):
-        random.shuffle(self.card_list)
+        """
+        洗牌(Fisher–Yates，一次即可得到均勻的排列)
+        :param is_show:
+        :return:
+        """
+        if self._top or len(self._order) != self._size:
+            self._compact()
+        # 直接在陣列上洗牌，不另外配置 list
+        self._rng.shuffle(self._order)
+        for index, code in enumerate(self._order):
+            self._position[code] = index
         if is_show:
             self.show_all()
 
     def show_all(self):
-        print(list(map(lambda x: x.img, self.card_list)))
+        print([_CARD_BY_CODE[code].img for code in self.codes])
+
+    def copy(self):
+        """
+        複製牌組(含順序)
+        :return: PokerGroup
+        """
+        group = PokerGroup(quantity=self.quantity, rng=self._rng, short_deck=self.short_deck)
+        group._order = array('b', self._order)
+        group._top = self._top
+        group._position = array('i', self._position)
+        group._mask = self._mask
+        group._size = self._size
+        return group
+
+    def reset(self, is_shuffle=True):
+        """
+        清空並重新填滿牌組，供模擬時重複使用
+        :param is_shuffle: 是否洗牌
+        :return:
+        """
+        self.clear()
+        self.fill_card_group(is_shuffle=is_shuffle)
 
     def specify_draw(self, draw_card: PokerCard, as_class=False):
         """
@@ -196,22 +377,14 @@ class PokerGroup(PokerDefinition):
         :param as_class:回傳class格式
         :return:
         """
-        if isinstance(draw_card, PokerCard):
-            draw_card = draw_card.text
-        elif isinstance(draw_card, str):
-            pass
-        else:
-            ValueError('格式錯誤,請使用PokerCard class 或是 "p5","t3"寫法')
-        # 透過映射關係找到牌
-        map_card_list = list(map(lambda x: x.text, self.card_list))
-        if draw_card not in map_card_list:
+        draw_card = self.check_poker_type(draw_card)
+        if draw_card is None or not self._mask >> draw_card.code & 1:
             return None
-        else:
-            res = self.card_list.pop(map_card_list.index(draw_card))
+        self._remove(draw_card.code)
         if as_class:
-            return res
+            return draw_card
         else:
-            return res.text
+            return draw_card.text
 
     def draw(self, number=1, _from='top', as_class=True):
         """
@@ -222,26 +395,39 @@ class PokerGroup(PokerDefinition):
         :return:
         """
         res = []
+        order = self._order
+        position = self._position
         for i in range(0, number):
-            if not self.card_list:
+            if not self._size:
                 break
             if _from == 'bottom':
-                drew_card = self.card_list.pop()
+                while position[order[-1]] != len(order) - 1:
+                    order.pop()
+                code = order.pop()
             else:
-                drew_card = self.card_list.pop(0)
+                while position[order[self._top]] != self._top:
+                    self._top += 1
+                code = order[self._top]
+                self._top += 1
+            self._remove(code)
+            drew_card = _CARD_BY_CODE[code]
             res.append(drew_card if as_class else drew_card.text)
         return res
 
     def add(self, poker_card_list, is_unique=True):
+        """
+        加入卡牌到牌組底部
+        :param poker_card_list: 卡牌
+        :param is_unique: 已存在時是否提示(同一張牌只會存在一次)
+        :return:
+        """
         for poker_card in poker_card_list:
             poker_card = self.check_poker_type(poker_card)
-            # 透過映射關係找到牌
-            map_card_list = list(map(lambda x: x.text, self.card_list))
-            if is_unique:
-                if poker_card.text in map_card_list:
+            if self._mask >> poker_card.code & 1:
+                if is_unique:
                     print(f'{poker_card} 已存在在牌堆裡,略過添加')
-                    continue
-            self.card_list.append(poker_card)
+                continue
+            self._push(poker_card.code)
 
 
 def _convert_poker_type(card):
@@ -288,3 +474,17 @@ def filter_poker_list(card_list, **kwargs):
         return _con
 
     return list(filter(filter_con, card_list))
+
+
+# 卡牌編碼 => PokerCard
+_CARD_BY_CODE = tuple(sorted((PokerCard(_type, number) for _type in PokerDefinition._type_limit
+                              for number in range(1, 14)), key=lambda card: card.code))
+
+
+def card_of_code(code):
+    """
+    卡牌整數編碼轉換為 PokerCard
+    :param code: 0~51
+    :return: PokerCard
+    """
+    return _CARD_BY_CODE[code]
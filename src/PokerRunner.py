@@ -0,0 +1,143 @@
+"""
+多行程批次牌局
+
+N 局依固定局數切成分片，每個分片的種子由主種子依序衍生，
+分片切法與工作行程數無關，因此不論幾個行程執行，合併後的結果都相同
+"""
+import os
+import random
+import sys
+from collections import Counter
+from concurrent.futures import as_completed
+
+from PokerEvaluator import STAGE_SHIFT
+from PokerSharedTables import shared_process_pool
+from TexasHoldem import CardTypeStageEnum
+from poker_test import ClassicPokerGame, Player
+
+DEFAULT_SHARD_SIZE = 1000
+
+
+class BatchResult:
+    """
+    可合併的批次結果
+    wins: 各玩家獨贏局數, ties: 各玩家平分底池局數,
+    winning_types: 贏家牌型次數(平分時只計一次), hand_types: 所有玩家河牌牌型次數
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.wins = Counter()
+        self.ties = Counter()
+        self.winning_types = Counter()
+        self.hand_types = Counter()
+
+    def merge(self, other):
+        """
+        合併另一個結果(就地)
+        :param other: BatchResult
+        :return: self
+        """
+        self.games += other.games
+        self.wins.update(other.wins)
+        self.ties.update(other.ties)
+        self.winning_types.update(other.winning_types)
+        self.hand_types.update(other.hand_types)
+        return self
+
+    def __add__(self, other):
+        return BatchResult().merge(self).merge(other)
+
+    def __eq__(self, other):
+        return isinstance(other, BatchResult) and self.__dict__ == other.__dict__
+
+
+def play_shard(games: int, player_num: int, seed: int) -> BatchResult:
+    """
+    以單一種子連續進行多局(於工作行程內執行)
+    :param games: 局數
+    :param player_num: 玩家人數
+    :param seed: 分片種子
+    :return: BatchResult
+    """
+    players = [Player(f'Player_{num}') for num in range(1, player_num + 1)]
+    game = ClassicPokerGame(_players=players, rng=random.Random(seed))
+    result = BatchResult()
+    seats = range(1, player_num + 1)
+    for _ in range(games):
+        game.reset()
+        game.game_start()
+        game.deal_all()
+        game.add_appear_card(3)
+        game.add_appear_card(1)
+        game.add_appear_card(1)
+        strengths = [game.player_strength(num) for num in seats]
+        best = max(strengths)
+        winners = [num for num in seats if strengths[num - 1] == best]
+        if len(winners) == 1:
+            result.wins[players[winners[0] - 1].name] += 1
+        else:
+            for num in winners:
+                result.ties[players[num - 1].name] += 1
+        result.winning_types[CardTypeStageEnum(best >> STAGE_SHIFT).name] += 1
+        for strength in strengths:
+            result.hand_types[CardTypeStageEnum(strength >> STAGE_SHIFT).name] += 1
+    result.games = games
+    return result
+
+
+def shard_plan(games: int, seed=None, shard_size=DEFAULT_SHARD_SIZE) -> list:
+    """
+    切分片並衍生各分片種子(只與局數、主種子、分片大小有關)
+    :return: [(局數, 種子), ...]
+    """
+    master = random.Random(seed)
+    return [(min(shard_size, games - start), master.getrandbits(64)) for start in range(0, games, shard_size)]
+
+
+def print_progress(done: int, total: int):
+    """
+    於標準錯誤輸出覆寫同一行進度
+    """
+    sys.stderr.write(f'\r{done}/{total} 局 ({done / total:.0%})')
+    if done >= total:
+        sys.stderr.write('\n')
+    sys.stderr.flush()
+
+
+def run_games(games: int, player_num=10, seed=None, workers=None, shard_size=DEFAULT_SHARD_SIZE,
+              progress=None) -> BatchResult:
+    """
+    批次進行多局
+    :param games: 總局數
+    :param player_num: 玩家人數
+    :param seed: 主亂數種子
+    :param workers: 工作行程數(預設為CPU數，1則不開行程池)
+    :param shard_size: 每個分片的局數
+    :param progress: 每完成一個分片呼叫 progress(已完成局數, 總局數)
+    :return: BatchResult
+    """
+    plan = shard_plan(games, seed, shard_size)
+    workers = min(workers or os.cpu_count() or 1, len(plan)) or 1
+    result = BatchResult()
+    if workers == 1:
+        for shard_games, shard_seed in plan:
+            result.merge(play_shard(shard_games, player_num, shard_seed))
+            if progress:
+                progress(result.games, games)
+        return result
+    # 工作行程共用查表(以 spawn 啟動，映射共享檔)
+    with shared_process_pool(max_workers=workers) as executor:
+        futures = [executor.submit(play_shard, shard_games, player_num, shard_seed) for shard_games, shard_seed in plan]
+        for future in as_completed(futures):
+            result.merge(future.result())
+            if progress:
+                progress(result.games, games)
+    return result
+
+
+if __name__ == '__main__':
+    batch_result = run_games(20000, seed=1, progress=print_progress)
+    print('獨贏:', batch_result.wins.most_common())
+    print('平分:', batch_result.ties.most_common())
+    print('贏家牌型:', batch_result.winning_types.most_common())
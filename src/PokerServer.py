@@ -0,0 +1,203 @@
+"""
+asyncio 多桌牌局引擎
+
+每張牌桌以協程執行階段流程(開始 → 發牌 → 翻牌 → 轉牌 → 河牌 → 比牌)，
+玩家行動逾時視為棄牌，比牌評估交由 executor 執行，單一事件迴圈可同時進行數千桌
+"""
+import asyncio
+from enum import Enum
+
+from PokerEvaluator import evaluate_best
+from TexasHoldem import strength_hand_type
+from poker_test import ClassicPokerGame, Player, PlayerStatus
+
+
+class GameStage(Enum):
+    Start = 0
+    Deal = 1
+    Flop = 2
+    Turn = 3
+    River = 4
+    Showdown = 5
+
+
+class PlayerAction(Enum):
+    Check = 'Check'
+    Drop = 'Drop'
+
+
+# 各階段加入的顯牌數
+STAGE_APPEAR_NUM = {GameStage.Flop: 3, GameStage.Turn: 1, GameStage.River: 1}
+# 需要玩家行動的階段
+BETTING_STAGES = (GameStage.Deal, GameStage.Flop, GameStage.Turn, GameStage.River)
+
+
+def showdown(hands: dict, board_codes: list) -> (list, int):
+    """
+    比牌(於 executor 執行，參數與回傳皆為可序列化的基本型別)
+    :param hands: {座位號碼: [卡牌編碼, 卡牌編碼]}
+    :param board_codes: 顯牌編碼
+    :return: 贏家座位號碼, 牌力
+    """
+    best = -1
+    winners = []
+    for num, hand in hands.items():
+        strength = evaluate_best(hand + board_codes)[1]
+        if strength > best:
+            best = strength
+            winners = [num]
+        elif strength == best:
+            winners.append(num)
+    return winners, best
+
+
+class LocalClient:
+    """
+    同行程內的玩家端替身
+    :param strategy: strategy(view) -> PlayerAction，預設一律 Check
+    :param delay: 每次回應前等待的秒數(模擬網路延遲)
+    """
+
+    def __init__(self, strategy=None, delay=0.0):
+        self.strategy = strategy
+        self.delay = delay
+        self.last_event = None
+
+    async def request_action(self, view: dict) -> PlayerAction:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.strategy(view) if self.strategy else PlayerAction.Check
+
+    async def notify(self, event: dict):
+        self.last_event = event
+
+
+class PokerTable:
+    """
+    單一牌桌
+    :param table_id: 牌桌編號
+    :param clients: 各座位的玩家端(需有 request_action、notify 協程)
+    :param action_timeout: 玩家行動逾時秒數
+    :param executor: 比牌使用的 executor(None 為事件迴圈預設的執行緒池)
+    :param rng: 洗牌使用的亂數產生器
+    """
+
+    def __init__(self, table_id, clients: list, action_timeout=10.0, executor=None, rng=None):
+        self.table_id = table_id
+        self.clients = clients
+        self.action_timeout = action_timeout
+        self.executor = executor
+        self.players = [Player(f'{table_id}_{num}') for num in range(1, len(clients) + 1)]
+        self.game = ClassicPokerGame(_players=self.players, rng=rng)
+        self.stage = GameStage.Start
+        self.timeouts = 0
+
+    def alive_seats(self) -> list:
+        return [num for num, player in enumerate(self.players, 1) if player.status == PlayerStatus.Alive]
+
+    async def _request_action(self, num: int) -> PlayerAction:
+        """
+        向玩家要求行動，逾時視為棄牌
+        """
+        view = {
+            "table": self.table_id,
+            "seat": num,
+            "stage": self.stage.name,
+            "hand": self.players[num - 1].show_hand(),
+            "board": self.game.appear_stack or [],
+        }
+        try:
+            return await asyncio.wait_for(self.clients[num - 1].request_action(view), self.action_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return PlayerAction.Drop
+
+    async def _betting_round(self):
+        seats = self.alive_seats()
+        actions = await asyncio.gather(*(self._request_action(num) for num in seats))
+        for num, action in zip(seats, actions):
+            if action == PlayerAction.Drop:
+                self.players[num - 1].set_drop()
+
+    async def play_hand(self) -> dict:
+        """
+        進行一局
+        :return: {"table", "stage", "winners", "hand_type", "value"}
+        """
+        self.stage = GameStage.Start
+        self.game.reset()
+        self.game.game_start()
+        winners, strength = [], None
+        for stage in GameStage:
+            if stage == GameStage.Start:
+                continue
+            self.stage = stage
+            if stage == GameStage.Deal:
+                self.game.deal_all()
+            elif stage in STAGE_APPEAR_NUM:
+                self.game.add_appear_card(STAGE_APPEAR_NUM[stage])
+            if stage in BETTING_STAGES:
+                await self._betting_round()
+                seats = self.alive_seats()
+                if len(seats) <= 1:
+                    # 其餘玩家皆棄牌，不需比牌
+                    winners = seats
+                    break
+            else:
+                hands = {num: [card.code for card in self.players[num - 1].show_hand(as_class=True)]
+                         for num in self.alive_seats()}
+                loop = asyncio.get_running_loop()
+                winners, strength = await loop.run_in_executor(
+                    self.executor, showdown, hands, list(self.game.appear_codes))
+        result = {
+            "table": self.table_id,
+            "stage": self.stage.name,
+            "winners": [self.players[num - 1].name for num in winners],
+            "hand_type": strength_hand_type(strength) if strength is not None else None,
+            "value": strength,
+        }
+        await asyncio.gather(*(client.notify(result) for client in self.clients))
+        return result
+
+    async def run(self, hands=1) -> list:
+        return [await self.play_hand() for _ in range(hands)]
+
+
+class TableServer:
+    """
+    於同一個事件迴圈上管理多張牌桌
+    :param action_timeout: 玩家行動逾時秒數
+    :param executor: 比牌使用的 executor，CPU 密集時可傳入 ProcessPoolExecutor
+    """
+
+    def __init__(self, action_timeout=10.0, executor=None):
+        self.action_timeout = action_timeout
+        self.executor = executor
+        self.tables = {}
+
+    def add_table(self, clients: list, rng=None) -> PokerTable:
+        table_id = len(self.tables) + 1
+        table = PokerTable(table_id, clients, self.action_timeout, self.executor, rng)
+        self.tables[table_id] = table
+        return table
+
+    async def run(self, hands=1) -> dict:
+        """
+        所有牌桌同時進行
+        :param hands: 每桌局數
+        :return: {牌桌編號: [每局結果, ...]}
+        """
+        results = await asyncio.gather(*(table.run(hands) for table in self.tables.values()))
+        return dict(zip(self.tables, results))
+
+
+if __name__ == '__main__':
+    import random
+    import time
+
+    server = TableServer(action_timeout=0.05)
+    for _ in range(1000):
+        server.add_table([LocalClient(delay=random.random() * 0.01) for _ in range(6)])
+    start_time = time.perf_counter()
+    table_results = asyncio.run(server.run(hands=3))
+    print(f'{len(table_results)} 桌, 每桌 3 局, 耗時 {time.perf_counter() - start_time:.2f} 秒')
@@ -0,0 +1,185 @@
+"""
+短牌(6+ Hold'em)牌力評估
+
+牌組只有 A、6~K 共 36 張，規則與德州撲克的差異:
+    A-6-7-8-9 為最小的順子(同花順)
+    同花大於葫蘆
+卡牌編碼與 PokerEvaluator 相同，另外產生短牌專用的查表(short_deck_tables.bin)，
+評估方式與 HandState 相同(點數多重集合鍵 + 花色遮罩查表)，速度與標準德州撲克一致。
+牌力中同花與葫蘆的牌型階級互換，確保單一整數即可比較大小，取牌型名稱時再換回
+"""
+import os
+import random
+from itertools import combinations
+from math import comb
+
+from PokerEquity import prepare_cards, tally_showdown, summarize
+from PokerEvaluator import STAGE_FULL_HOUSE, STAGE_FLUSH, STAGE_SHIFT, RANK_COUNT_KEY, _RANK_BIT, HandState, \
+    RankStrengthCache, build_tables, encode_cards, load_tables, make_evaluate5
+from PokerRule import _convert_poker_type
+from TexasHoldem import CardTypeStageEnum
+
+SHORT_DECK_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'short_deck_tables.bin')
+# 點數 6~14 (點數索引 4~12)
+SHORT_RANKS = tuple(range(6, 15))
+SHORT_DECK_CODES = tuple(code for code in range(52) if code >> 2 >= SHORT_RANKS[0] - 2)
+# A-6-7-8-9 的點數遮罩
+_WHEEL_MASK = 1 << 12 | 0b1111 << 4
+
+# 同花與葫蘆的牌型階級互換(互換兩次即還原)
+_STAGE_SWAP = {STAGE_FLUSH: STAGE_FULL_HOUSE, STAGE_FULL_HOUSE: STAGE_FLUSH}
+STAGE_SHORT_FLUSH = _STAGE_SWAP[STAGE_FLUSH]
+STAGE_SHORT_FULL_HOUSE = _STAGE_SWAP[STAGE_FULL_HOUSE]
+
+
+def _straight_high(rank_mask):
+    """
+    點數遮罩中最大的短牌順子
+    :param rank_mask: 點數位元遮罩
+    :return: 最大點數(A-6-7-8-9 為9，無順子為0)
+    """
+    for high in range(14, 9, -1):
+        straight_mask = 0b11111 << (high - 6)
+        if rank_mask & straight_mask == straight_mask:
+            return high
+    if rank_mask & _WHEEL_MASK == _WHEEL_MASK:
+        return 9
+    return 0
+
+
+def build_short_deck_tables() -> dict:
+    """
+    計算短牌的查表(表名稱與格式同 PokerEvaluator.build_tables，可用 save_tables / load_tables 存取)
+    :return: {表名稱: list 或 dict}
+    """
+    return build_tables(SHORT_RANKS, _straight_high, _STAGE_SWAP)
+
+
+# 與 PokerEvaluator 相同，import 時載入並轉為 list
+_tables = load_tables(SHORT_DECK_TABLE_PATH, builder=build_short_deck_tables)
+SHORT_FLUSH_TABLE = _tables['FLUSH_TABLE']
+SHORT_UNIQUE5_TABLE = _tables['UNIQUE5_TABLE']
+SHORT_PRODUCT_TABLE = _tables['PRODUCT_TABLE']
+SHORT_STRAIGHT_HIGH_TABLE = _tables['STRAIGHT_HIGH_TABLE']
+SHORT_FLUSH_BEST_TABLE = _tables['FLUSH_BEST_TABLE']
+del _tables
+
+
+def short_deck_stage(strength: int) -> int:
+    """
+    從短牌牌力取出牌型階級(對應 CardTypeStageEnum)
+    :param strength: 短牌牌力
+    :return: int
+    """
+    stage = strength >> STAGE_SHIFT
+    return _STAGE_SWAP.get(stage, stage)
+
+
+def short_deck_hand_type(strength: int) -> str:
+    """
+    由短牌牌力取得牌型名稱
+    :param strength: 短牌牌力
+    :return: CardTypeEnum 的值
+    """
+    return CardTypeStageEnum(short_deck_stage(strength)).name
+
+
+# 評估五張短牌: evaluate5_short_deck(c0, c1, c2, c3, c4) -> 短牌牌力(int)
+evaluate5_short_deck = make_evaluate5(SHORT_FLUSH_TABLE, SHORT_UNIQUE5_TABLE, SHORT_PRODUCT_TABLE)
+# 點數多重集合鍵 => 不計同花時的短牌最佳牌力
+SHORT_RANK_STRENGTH = RankStrengthCache(evaluate5_short_deck)
+
+
+def evaluate_short_deck(codes) -> int:
+    """
+    評估最多七張短牌(取最佳五張)
+    七張以內成立同花時，不可能同時成立鐵支或葫蘆
+    :param codes: 卡牌編碼 list
+    :return: 短牌牌力(int)
+    """
+    rank_key = 0
+    suit_masks = [0, 0, 0, 0]
+    suit_counts = [0, 0, 0, 0]
+    for code in codes:
+        suit = code & 3
+        rank_key += RANK_COUNT_KEY[code]
+        suit_masks[suit] |= _RANK_BIT[code]
+        suit_counts[suit] += 1
+    for suit in range(4):
+        if suit_counts[suit] >= 5:
+            return SHORT_FLUSH_BEST_TABLE[suit_masks[suit]]
+    return SHORT_RANK_STRENGTH[rank_key]
+
+
+class ShortDeckHandState(HandState):
+    """
+    逐張累加的短牌手牌狀態(介面同 HandState，改用短牌查表)
+    :param codes: 初始卡牌編碼(手牌)
+    """
+    __slots__ = ()
+    rank_strength = SHORT_RANK_STRENGTH
+    flush_best_table = SHORT_FLUSH_BEST_TABLE
+
+
+def get_best_short_deck_hand(card_list: list):
+    """
+    短牌的最佳組合(最多7張)
+    :param card_list: [PokerCard(),PokerCard(),...]
+    :return: [PokerCard(),PokerCard(),...],str,int
+    """
+    card_list = [_convert_poker_type(card) for card in card_list]
+    codes = encode_cards(card_list)
+    strength = evaluate_short_deck(codes)
+    if len(codes) > 5:
+        for indexes in combinations(range(len(codes)), 5):
+            if evaluate5_short_deck(*(codes[index] for index in indexes)) == strength:
+                card_list = [card_list[index] for index in indexes]
+                break
+    return sorted(card_list), short_deck_hand_type(strength), strength
+
+
+def _short_deck_strength(hand_codes: list, board_codes: list) -> int:
+    """
+    供 tally_showdown 使用的短牌牌力
+    """
+    return evaluate_short_deck(hand_codes + board_codes)
+
+
+def short_deck_equity(hands: list, board=None, dead=None, trials=100000, seed=None) -> list:
+    """
+    短牌勝率(剩餘顯牌不超過2張時窮舉，否則蒙地卡羅模擬)
+    :param hands: 各玩家手牌(只能使用 A、6~K)
+    :param board: 已出現的顯牌(0~5張)
+    :param dead: 死牌
+    :param trials: 模擬次數(窮舉時不使用)
+    :param seed: 亂數種子
+    :return: [{"win":float, "tie":float, "equity":float, "ci":(float, float)}, ...]
+    """
+    if trials < 1:
+        raise ValueError(f'模擬次數至少為1，目前為{trials}')
+    hand_codes, board_codes, remaining = prepare_cards(hands, board, dead)
+    for code in [code for hand in hand_codes for code in hand] + board_codes:
+        if code not in SHORT_DECK_CODES:
+            raise ValueError('短牌牌組沒有 2~5')
+    remaining = [code for code in remaining if code in SHORT_DECK_CODES]
+    player_num = len(hand_codes)
+    wins, ties = [0] * player_num, [0] * player_num
+    shares, shares_sq = [0.0] * player_num, [0.0] * player_num
+    missing = 5 - len(board_codes)
+    if missing <= 2:
+        for runout in combinations(remaining, missing):
+            tally_showdown(hand_codes, board_codes + list(runout), wins, ties, shares, shares_sq,
+                           evaluator=_short_deck_strength)
+        return summarize(comb(len(remaining), missing), wins, ties, shares)
+    sample = random.Random(seed).sample
+    for _ in range(trials):
+        tally_showdown(hand_codes, board_codes + sample(remaining, missing), wins, ties, shares, shares_sq,
+                       evaluator=_short_deck_strength)
+    return summarize(trials, wins, ties, shares, shares_sq)
+
+
+if __name__ == '__main__':
+    print(get_best_short_deck_hand(['p1', 'h6', 'c7', 't8', 'p9', 'h13', 'c13']))
+    print(get_best_short_deck_hand(['p1', 'p6', 'p10', 't10', 'p9', 'h10', 'p13']))
+    for player_result in short_deck_equity([['p1', 'h1'], ['c13', 't12']], seed=1, trials=20000):
+        print(player_result)
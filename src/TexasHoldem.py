@@ -1,8 +1,9 @@
-import copy
 from collections import Counter
 from enum import Enum
+from operator import attrgetter, itemgetter
 
 from PokerRule import PokerGroup, PokerDefinition, _convert_poker_type, poker_value_sum, filter_poker_list
+from PokerEvaluator import evaluate, evaluate_best, encode_cards, strength_stage
 
 
 class CardTypeEnum(Enum):
@@ -64,18 +65,10 @@ class TexasRule(PokerDefinition):
         :param is_number:
         :return:
         """
-        sorted_list = copy.deepcopy(self.card_list)
-
         if key not in ['number', 'value']:
             key = 'value'
-
-        limit = len(self.card_list)
-        for _first in range(limit):
-            for _second in range(0, limit - _first - 1):
-                first_value = getattr(sorted_list[_second], key)
-                second_value = getattr(sorted_list[_second + 1], key)
-                if first_value > second_value:
-                    sorted_list[_second], sorted_list[_second + 1] = sorted_list[_second + 1], sorted_list[_second]
+        # PokerCard 為不可變的共用實例，不需複製即可排序
+        sorted_list = sorted(self.card_list, key=attrgetter(key))
 
         if as_class:
             return sorted_list
@@ -205,7 +198,7 @@ class TexasRule(PokerDefinition):
         elif count_list.count(2) == 2:
             total_value = 0
             count_dict = self.get_count('number')
-            copy_card_list = copy.deepcopy(self.card_list)
+            copy_card_list = list(self.card_list)
             for num in count_dict:
                 if count_dict[num] == 2:
                     _filter_pair = filter_poker_list(self.card_list, number=num)
@@ -233,32 +226,59 @@ class TexasRule(PokerDefinition):
         value_list = map(lambda x: x.value, self.card_list)
         return sum(value_list)
 
+    @property
+    def strength(self) -> int:
+        """
+        以查表評估器計算牌力(牌型階級與由大到小的比較點數合成的單一整數)
+        :return: int
+        """
+        return hand_strength(self.card_list)
+
     @property
     def check(self) -> (bool, int):
         """
         檢查牌型
-        :return: 牌型、
+        :return: 牌型、牌力(可直接跨牌型比較大小)
         """
-        if len(self.card_list) >= 5:
-            is_flush, flush_value = self.is_flush
-            is_straight, straight_value = self.is_straight
-            if is_flush and is_straight and straight_value >= 205:
-                ans = CardTypeEnum.RoyalFlush.value
-                return_value = straight_value
-            elif is_flush and is_straight:
-                ans = CardTypeEnum.StraightFlush.value
-                return_value = straight_value
-            elif is_flush:
-                ans = CardTypeEnum.Flush.value
-                return_value = flush_value
-            elif is_straight:
-                ans = CardTypeEnum.Straight.value
-                return_value = straight_value
-            else:
-                ans, return_value = self.judge_kinds
-        else:
-            ans, return_value = self.judge_kinds
-        return ans, return_value
+        if len(self.card_list) < 2:
+            return self.judge_kinds
+        strength = self.strength
+        return strength_hand_type(strength), strength
+
+
+# 牌力評估快取(PokerCache.EvaluationCache)，None 代表不使用快取
+_evaluation_cache = None
+
+
+def set_evaluation_cache(cache=None):
+    """
+    設定 TexasRule.check 等函式共用的牌力評估快取
+    :param cache: EvaluationCache，None 則停用快取
+    :return: 先前的快取
+    """
+    global _evaluation_cache
+    previous, _evaluation_cache = _evaluation_cache, cache
+    return previous
+
+
+def hand_strength(card_list: list) -> int:
+    """
+    計算牌力，有設定快取時先查快取
+    :param card_list: [PokerCard(),PokerCard(),...]
+    :return: int
+    """
+    if _evaluation_cache is None:
+        return evaluate(card_list)
+    return _evaluation_cache.evaluate(encode_cards(card_list))
+
+
+def strength_hand_type(strength: int) -> str:
+    """
+    由牌力取得牌型名稱
+    :param strength: 牌力
+    :return: CardTypeEnum 的值
+    """
+    return CardTypeStageEnum(strength_stage(strength)).name
 
 
 def get_biggest_stack_type(stacks: list):
@@ -270,26 +290,28 @@ def get_biggest_stack_type(stacks: list):
                     ]
     :return: [PokerCard(),PokerCard(),...],str,int
     """
-    biggest_hand_type = []
-    for sub_cards in stacks:
-        if not biggest_hand_type:
-            biggest_hand_type = sub_cards
-        else:
-            old_hand_type, old_value = TexasRule(biggest_hand_type).check
-            new_hand_type, new_value = TexasRule(sub_cards).check
-            if CardTypeStageEnum[new_hand_type].value > CardTypeStageEnum[old_hand_type].value:
-                biggest_hand_type = sub_cards
-                continue
-            elif CardTypeStageEnum[new_hand_type].value == CardTypeStageEnum[old_hand_type].value:
-                if new_value > old_value:
-                    biggest_hand_type = sub_cards
-                continue
-            else:
-                continue
+    if not stacks:
+        biggest_hand_type = []
+    else:
+        biggest_hand_type = max(stacks, key=hand_strength)
     final_hand_type, final_value = TexasRule(biggest_hand_type).check
     return sorted(biggest_hand_type), final_hand_type, final_value
 
 
+def get_best_hand(card_list: list):
+    """
+    一次評估手牌與顯牌(最多7張)的最佳組合，不需列舉所有五張組合
+    :param card_list: [PokerCard(),PokerCard(),...]
+    :return: [PokerCard(),PokerCard(),...],str,int
+    """
+    card_list = [_convert_poker_type(card) for card in card_list]
+    codes = encode_cards(card_list)
+    best_codes, strength = evaluate_best(codes)
+    card_of_code = dict(zip(codes, card_list))
+    best_cards = [card_of_code[code] for code in best_codes]
+    return sorted(best_cards), strength_hand_type(strength), strength
+
+
 def judge_winner(hands_list: list):
     """
     判斷贏家
@@ -301,22 +323,29 @@ def judge_winner(hands_list: list):
                        ]
     :return:
     """
-    biggest_hand = {}
-    for hand in hands_list:
-        if not biggest_hand:
-            biggest_hand = hand
-        else:
-            old_hand_type = biggest_hand.get('hand_type')
-            old_hand_value = biggest_hand.get('value')
-            new_hand_type = hand.get('hand_type')
-            new_hand_value = hand.get('value')
-            if CardTypeStageEnum[new_hand_type].value > CardTypeStageEnum[old_hand_type].value:
-                biggest_hand = hand
-                continue
-            elif CardTypeStageEnum[new_hand_type].value == CardTypeStageEnum[old_hand_type].value:
-                if new_hand_value > old_hand_value:
-                    biggest_hand = hand
-                continue
-            else:
-                continue
-    return biggest_hand
+    if not hands_list:
+        return {}
+    # value 為包含牌型階級的單一牌力，直接取最大值(同牌力時取第一個)
+    return max(hands_list, key=itemgetter('value'))
+
+
+def judge_winners(hands_list: list) -> list:
+    """
+    判斷贏家(含平手，平分底池)
+    :param hands_list: 同 judge_winner
+    :return: [{...}, ...] 所有牌力最大的玩家
+    """
+    if not hands_list:
+        return []
+    best_value = max(map(itemgetter('value'), hands_list))
+    return [hand for hand in hands_list if hand['value'] == best_value]
+
+
+def sort_hands(hands_list: list, reverse=True) -> list:
+    """
+    依牌力排序
+    :param hands_list: 同 judge_winner
+    :param reverse: 是否由大到小
+    :return: [{...}, ...]
+    """
+    return sorted(hands_list, key=itemgetter('value'), reverse=reverse)
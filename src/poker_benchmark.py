@@ -0,0 +1,382 @@
+"""
+效能量測用執行檔
+
+python poker_benchmark.py                  執行所有量測並顯示每秒處理量
+python poker_benchmark.py --save-baseline  執行後寫入基準檔
+python poker_benchmark.py --compare        與基準檔比較，處理量下降超過門檻時以非0結束
+python poker_benchmark.py --allocations    比較重新建立與重複使用牌局的記憶體配置
+python poker_benchmark.py --import-time    以 python -X importtime 量測 import 時間，超過上限時以非0結束
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from PokerEquity import monte_carlo_equity
+from PokerEvaluator import evaluate5, evaluate_best
+from PokerOmaha import evaluate_omaha
+from PokerShortDeck import SHORT_DECK_CODES, evaluate_short_deck
+from PokerPreflop import preflop_equity
+from PokerRule import PokerGroup, card_of_code
+from TexasHoldem import TexasRule, get_best_hand, get_biggest_stack_type
+from poker_test import ClassicPokerGame, Player
+
+PLAYER_NUM = 10
+SEED = 20230823
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+# 可接受的處理量下降比例(同一台機器重複執行的差異可達 40%，門檻需高於此雜訊)
+DEFAULT_THRESHOLD = 0.5
+# import 時間上限(毫秒，含所有相依模組)
+IMPORT_TIME_BUDGET_MS = {
+    'PokerRule': 20,
+    'PokerEvaluator': 40,
+    'TexasHoldem': 50,
+    'poker_test': 60,
+}
+
+
+def play_one_game(game: ClassicPokerGame):
+    """
+    進行一局完整牌局(發牌、翻牌、轉牌、河牌)
+    :param game:
+    :return: 贏家
+    """
+    game.game_start()
+    game.deal_all()
+    game.judge_player_winnable()
+    game.add_appear_round(3)
+    game.add_appear_round(1)
+    return game.add_appear_round(1)
+
+
+def fresh_game_runner(player_num=PLAYER_NUM):
+    """
+    每局重新建立牌局與玩家
+    """
+
+    def run():
+        players = [Player(f'Player_{num}') for num in range(1, player_num + 1)]
+        game = ClassicPokerGame(_players=players)
+        play_one_game(game)
+        return game
+
+    return run
+
+
+def pooled_game_runner(player_num=PLAYER_NUM):
+    """
+    重複使用同一個牌局與玩家(每局 reset)
+    """
+    players = [Player(f'Player_{num}') for num in range(1, player_num + 1)]
+    game = ClassicPokerGame(_players=players)
+
+    def run():
+        game.reset()
+        play_one_game(game)
+        return game
+
+    return run
+
+
+def measure_allocations(run_game, games=200) -> dict:
+    """
+    以 tracemalloc 量測每局的記憶體配置
+    保留每局結束時的牌局物件後比對快照，計算該局新配置且仍存活的記憶體區塊數，並記錄單局峰值
+    :param run_game: 執行一局並回傳牌局物件的函式
+    :param games: 局數
+    :return: {"blocks_per_game":float, "kib_per_game":float, "peak_kib":float}
+    """
+    run_game()
+    # 排除快照本身造成的配置
+    snapshot_filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    tracemalloc.start()
+    blocks = 0
+    size = 0
+    peak = 0
+    for _ in range(games):
+        before = tracemalloc.take_snapshot().filter_traces(snapshot_filters)
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        game = run_game()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - start_memory)
+        after = tracemalloc.take_snapshot().filter_traces(snapshot_filters)
+        for stat in after.compare_to(before, 'lineno'):
+            if stat.count_diff > 0:
+                blocks += stat.count_diff
+                size += stat.size_diff
+        del game
+    tracemalloc.stop()
+    return {
+        "blocks_per_game": blocks / games,
+        "kib_per_game": size / games / 1024,
+        "peak_kib": peak / 1024,
+    }
+
+
+def allocation_benchmark(games=200, seed=0):
+    """
+    比較每局重新建立與重複使用牌局的記憶體配置
+    :param games: 局數
+    :param seed: 亂數種子
+    :return:
+    """
+    for name, runner in (('重新建立', fresh_game_runner()), ('重複使用', pooled_game_runner())):
+        random.seed(seed)
+        result = measure_allocations(runner, games)
+        print(f'{name}: 每局新增區塊 {result["blocks_per_game"]:.1f} 個, '
+              f'{result["kib_per_game"]:.2f} KiB, 單局峰值 {result["peak_kib"]:.2f} KiB')
+
+
+def measure_import_time(module: str, repeat=5) -> float:
+    """
+    以 python -X importtime 量測模組(含相依模組)的 import 時間，取多次中最快的一次
+    先執行一次產生 .pyc，量測時不計入編譯時間
+    :param module: 模組名稱
+    :param repeat: 重複次數
+    :return: 毫秒
+    """
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    subprocess.run([sys.executable, '-c', f'import {module}'], cwd=source_dir, env=env, check=True)
+    best = None
+    for _ in range(repeat):
+        stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=source_dir,
+                                env=env, check=True, capture_output=True, text=True).stderr
+        for line in stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == module and not fields[2][1:].startswith(' '):
+                cumulative = int(fields[1]) / 1000
+                best = cumulative if best is None else min(best, cumulative)
+    return best
+
+
+def import_time_benchmark(repeat=5) -> list:
+    """
+    量測各模組 import 時間並與上限比較
+    :param repeat: 重複次數
+    :return: 超過上限的模組 [(name, 上限, 目前), ...]
+    """
+    over_budget = []
+    for module, budget in IMPORT_TIME_BUDGET_MS.items():
+        elapsed = measure_import_time(module, repeat)
+        print(f'{module:<24}{elapsed:>10.1f} ms (上限 {budget} ms)')
+        if elapsed > budget:
+            over_budget.append((module, budget, elapsed))
+    return over_budget
+
+
+# 固定種子的工作量: 各函式回傳「執行一次工作量的函式」與處理數量、單位
+def random_hands(card_num, number, seed=SEED) -> list:
+    rng = random.Random(seed)
+    return [rng.sample(range(52), card_num) for _ in range(number)]
+
+
+def workload_texas_rule_check(number=20000):
+    hands = [[card_of_code(code) for code in hand] for hand in random_hands(5, number)]
+
+    def run():
+        for hand in hands:
+            TexasRule(hand).check
+
+    return run, number, 'hands'
+
+
+def workload_evaluate5(number=200000):
+    hands = random_hands(5, number)
+
+    def run():
+        for hand in hands:
+            evaluate5(*hand)
+
+    return run, number, 'hands'
+
+
+def workload_best_hand_7(number=20000):
+    hands = [[card_of_code(code) for code in hand] for hand in random_hands(7, number)]
+
+    def run():
+        for hand in hands:
+            get_best_hand(hand)
+
+    return run, number, 'hands'
+
+
+def workload_holdem_showdown(number=20000):
+    hands = random_hands(7, number)
+
+    def run():
+        for hand in hands:
+            evaluate_best(hand)
+
+    return run, number, 'hands'
+
+
+def workload_omaha_showdown(number=20000):
+    hands = random_hands(9, number)
+
+    def run():
+        for hand in hands:
+            evaluate_omaha(hand[:4], hand[4:])
+
+    return run, number, 'hands'
+
+
+def workload_short_deck_showdown(number=20000):
+    rng = random.Random(SEED)
+    hands = [rng.sample(SHORT_DECK_CODES, 7) for _ in range(number)]
+
+    def run():
+        for hand in hands:
+            evaluate_short_deck(hand)
+
+    return run, number, 'hands'
+
+
+def workload_biggest_stack_type_7(number=2000):
+    stacks = [ClassicPokerGame.C_function([card_of_code(code) for code in hand])
+              for hand in random_hands(7, number)]
+
+    def run():
+        for sub_card_lists in stacks:
+            get_biggest_stack_type(sub_card_lists)
+
+    return run, number, 'hands'
+
+
+def workload_fill_card_group(number=5000):
+    def run():
+        group = PokerGroup(rng=random.Random(SEED))
+        for _ in range(number):
+            group.reset(is_shuffle=True)
+
+    return run, number, 'decks'
+
+
+def workload_full_game(number=200):
+    run_game = pooled_game_runner()
+
+    def run():
+        random.seed(SEED)
+        for _ in range(number):
+            run_game()
+
+    return run, number, 'games'
+
+
+def workload_monte_carlo_equity(number=20000):
+    def run():
+        monte_carlo_equity([['p1', 'h1'], ['c13', 't12']], trials=number, workers=1, seed=SEED)
+
+    return run, number, 'trials'
+
+
+def workload_preflop_lookup(number=100000):
+    hands = [[card_of_code(code).img for code in hand] for hand in random_hands(2, 1000)]
+
+    def run():
+        for index in range(number):
+            preflop_equity(hands[index % 1000], index % 9 + 1)
+
+    return run, number, 'lookups'
+
+
+WORKLOADS = {
+    'texas_rule_check': workload_texas_rule_check,
+    'evaluate5': workload_evaluate5,
+    'best_hand_7': workload_best_hand_7,
+    'holdem_showdown': workload_holdem_showdown,
+    'omaha_showdown': workload_omaha_showdown,
+    'short_deck_showdown': workload_short_deck_showdown,
+    'biggest_stack_type_7': workload_biggest_stack_type_7,
+    'fill_card_group': workload_fill_card_group,
+    'full_game_10_players': workload_full_game,
+    'monte_carlo_equity': workload_monte_carlo_equity,
+    'preflop_lookup': workload_preflop_lookup,
+}
+
+
+def run_benchmarks(names=None, repeat=3) -> dict:
+    """
+    執行量測(取多次中最快的一次)
+    :param names: 要執行的工作量名稱(預設全部)
+    :param repeat: 重複次數
+    :return: {name: {"per_sec":float, "unit":str}}
+    """
+    results = {}
+    for name in names or WORKLOADS:
+        run, number, unit = WORKLOADS[name]()
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {"per_sec": number / best, "unit": unit}
+        print(f'{name:<24}{number / best:>14,.0f} {unit}/sec')
+    return results
+
+
+def compare_with_baseline(results: dict, baseline: dict, threshold=DEFAULT_THRESHOLD) -> list:
+    """
+    與基準比較
+    :param results: run_benchmarks 結果
+    :param baseline: 基準檔內容
+    :param threshold: 可接受的處理量下降比例
+    :return: 退步的工作量 [(name, 基準, 目前), ...]
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["per_sec"] / baseline[name]["per_sec"]
+        print(f'{name:<24}{ratio:>8.2%} 基準')
+        if ratio < 1 - threshold:
+            regressions.append((name, baseline[name]["per_sec"], result["per_sec"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='撲克效能量測')
+    parser.add_argument('names', nargs='*', help=f'要執行的工作量({", ".join(WORKLOADS)})')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help='基準檔路徑')
+    parser.add_argument('--save-baseline', action='store_true', help='寫入基準檔')
+    parser.add_argument('--compare', action='store_true', help='與基準檔比較')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='可接受的處理量下降比例')
+    parser.add_argument('--repeat', type=int, default=3, help='重複次數')
+    parser.add_argument('--allocations', action='store_true', help='比較牌局重複使用的記憶體配置')
+    parser.add_argument('--import-time', action='store_true', help='量測 import 時間並檢查上限')
+    args = parser.parse_args(argv)
+    unknown_names = set(args.names) - set(WORKLOADS)
+    if unknown_names:
+        parser.error(f'不存在的工作量: {", ".join(sorted(unknown_names))}')
+
+    if args.allocations:
+        allocation_benchmark()
+        return 0
+    if args.import_time:
+        over_budget = import_time_benchmark(args.repeat)
+        for module, budget, elapsed in over_budget:
+            print(f'import 過慢: {module} {elapsed:.1f} ms > {budget} ms')
+        return 1 if over_budget else 0
+    results = run_benchmarks(args.names, args.repeat)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        for name, baseline_per_sec, per_sec in regressions:
+            print(f'效能退步: {name} {baseline_per_sec:,.0f} => {per_sec:,.0f}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,10 @@
 from enum import Enum
 from time import sleep
 from itertools import combinations
-from PokerRule import PokerGroup, PokerCard
-from TexasHoldem import TexasRule, CardTypeEnumCn, CardTypeEnum, CardTypeStageEnum, get_biggest_stack_type, judge_winner
+from PokerRule import PokerGroup, PokerCard, card_of_code
+from TexasHoldem import TexasRule, CardTypeEnumCn, CardTypeEnum, CardTypeStageEnum, get_biggest_stack_type, judge_winner, \
+    get_best_hand, judge_winners
+from PokerEvaluator import HandState, STAGE_SHIFT
 
 
 class PlayerStatus(Enum):
@@ -12,6 +14,16 @@ class PlayerStatus(Enum):
     Out = '4'
 
 
+class GameType(Enum):
+    Holdem = 'Holdem'
+    Omaha = 'Omaha'
+    ShortDeck = 'ShortDeck'
+
+
+# 各玩法的手牌張數
+HOLE_NUMBER = {GameType.Holdem: 2, GameType.Omaha: 4, GameType.ShortDeck: 2}
+
+
 class Player:
     def __init__(self, account: str):
         self._account = account
@@ -19,7 +31,17 @@ class Player:
         self._hand_stack = PokerGroup()
 
     def get_card(self, card_list):
-        self._hand_stack = PokerGroup(card_list)
+        # 沿用同一個手牌牌組，避免每局重新建立
+        self._hand_stack.clear()
+        self._hand_stack.add(card_list)
+
+    def reset(self):
+        """
+        重置玩家狀態與手牌，供下一局重複使用
+        :return:
+        """
+        self._status = PlayerStatus.Alive
+        self._hand_stack.clear()
 
     def set_drop(self):
         self._status = PlayerStatus.Drop
@@ -48,13 +70,24 @@ class Player:
 
 
 class ClassicPokerGame:
-    def __init__(self, _players: list, hand_number=5):
+    def __init__(self, _players: list, hand_number=5, rng=None, game_type=GameType.Holdem):
+        """
+        :param _players: 玩家
+        :param hand_number:
+        :param rng: 牌庫洗牌使用的亂數產生器(預設為 random 模組)，固定後可重現整個牌局序列
+        :param game_type: 玩法(GameType.Omaha 時每人4張手牌，必須恰好使用2張手牌與3張顯牌；
+                          GameType.ShortDeck 時使用 36 張短牌牌組與短牌牌型大小)
+        """
         self._players = _players
+        self._game_type = game_type
         self._player_num = 4
         self._hand_number = hand_number
         self._stage = 0
-        self._dealer_stack = PokerGroup()
+        self._dealer_stack = PokerGroup(rng=rng, short_deck=game_type == GameType.ShortDeck)
         self._appear_stack = PokerGroup()
+        # 各座位的逐街手牌狀態與當前領先座位
+        self._hand_states = {}
+        self._leader = None
 
     @property
     def dealer_stack(self):
@@ -64,6 +97,38 @@ class ClassicPokerGame:
     def appear_stack(self):
         return self._appear_stack.content()
 
+    @property
+    def appear_codes(self):
+        return self._appear_stack.codes
+
+    @property
+    def game_type(self):
+        return self._game_type
+
+    @property
+    def players(self):
+        return self._players
+
+    @property
+    def leader(self):
+        """
+        當前領先的座位號碼(由逐街手牌狀態維護)
+        """
+        return self._leader
+
+    def reset(self):
+        """
+        重置牌局(沿用牌組與玩家物件)，供大量模擬時重複使用
+        :return:
+        """
+        self._stage = 0
+        self._dealer_stack.clear()
+        self._appear_stack.clear()
+        self._hand_states.clear()
+        self._leader = None
+        for player in self._players:
+            player.reset()
+
     def next_stage(self):
         self._stage += 1
         self.swift_stage()
@@ -105,17 +170,32 @@ class ClassicPokerGame:
         # print(f'當前贏面大的是 {stronger.get("index")} 號玩家 {stronger.get("player").name}')
         return stronger
 
-    def deal_specify(self, player_seat_num: int, deal_num=2):
+    def deal_specify(self, player_seat_num: int, deal_num=None):
         """
         指定發牌
         :param player_seat_num: 玩家座位號碼(1~X)
-        :param deal_num: 發牌數量(預設2)
+        :param deal_num: 發牌數量(預設依玩法，德州撲克2張、奧馬哈4張)
         :return:
         """
         specify_player = self.legal_number_player(player_seat_num)
         if not specify_player:
             return
-        specify_player.get_card(self._dealer_stack.draw(deal_num))
+        card_list = self._dealer_stack.draw(deal_num or HOLE_NUMBER[self._game_type])
+        specify_player.get_card(card_list)
+        hole_codes = [card.code for card in card_list]
+        appear_codes = [card.code for card in self._appear_stack.content(as_class=True) or []]
+        # 奧馬哈、短牌模組(及其依賴的勝率模組)只在使用該玩法時才載入
+        if self._game_type == GameType.Omaha:
+            from PokerOmaha import OmahaHandState
+
+            self._hand_states[player_seat_num] = OmahaHandState(hole_codes, appear_codes)
+        elif self._game_type == GameType.ShortDeck:
+            from PokerShortDeck import ShortDeckHandState
+
+            self._hand_states[player_seat_num] = ShortDeckHandState(hole_codes + appear_codes)
+        else:
+            self._hand_states[player_seat_num] = HandState(hole_codes + appear_codes)
+        self._update_leader()
 
     def legal_number_player(self, player_num) -> Player:
         """
@@ -150,7 +230,27 @@ class ClassicPokerGame:
         :param add_num: 增加數量
         :return:
         """
-        self._appear_stack.add(self._dealer_stack.draw(add_num))
+        card_list = self._dealer_stack.draw(add_num)
+        self._appear_stack.add(card_list)
+        # 逐街更新各玩家手牌狀態，不需重新評估整手牌
+        codes = [card.code for card in card_list]
+        for state in self._hand_states.values():
+            state.add(codes)
+        self._update_leader()
+
+    def _update_leader(self):
+        """
+        依各玩家手牌狀態更新當前領先座位(同牌力時以座位號小者為準)
+        :return:
+        """
+        self._leader = None
+        leader_strength = -1
+        for num, state in self._hand_states.items():
+            if self._players[num - 1].status != PlayerStatus.Alive:
+                continue
+            if state.strength > leader_strength or (state.strength == leader_strength and num < self._leader):
+                self._leader = num
+                leader_strength = state.strength
 
     @staticmethod
     def C_function(original_list: list, sublist_length=5) -> list:
@@ -170,42 +270,129 @@ class ClassicPokerGame:
         :return:
         """
         specify_player = self.legal_number_player(player_num)
+        if self._game_type == GameType.Omaha:
+            from PokerOmaha import get_best_omaha_hand
+
+            return get_best_omaha_hand(specify_player.show_hand(as_class=True),
+                                       self._appear_stack.content(as_class=True) or [])
         if self._appear_stack.content():
             all_card_list = specify_player.show_hand(as_class=True) + self._appear_stack.content(as_class=True)
         else:
             all_card_list = specify_player.show_hand(as_class=True)
-        sub_len = 5 if len(all_card_list) >= 5 else len(all_card_list)
-        sub_card_lists = self.C_function(all_card_list, sub_len)
-        return get_biggest_stack_type(sub_card_lists)
+        if self._game_type == GameType.ShortDeck:
+            from PokerShortDeck import get_best_short_deck_hand
+
+            return get_best_short_deck_hand(all_card_list)
+        return get_best_hand(all_card_list)
 
     def judge_player_winnable(self):
         """
         根據當前情況 判斷當前贏家
         :return:
         """
-        player_hands = []
-        for num in range(1, self._player_num + 1):
-            player = self.legal_number_player(num)
-            if player:
-                card_list, hand_type, value = self.card_check(num)
-                player_hand = {
-                    "index": num,
-                    "player": player,
-                    "hand": player.show_hand(),
-                    'win_list': card_list,
-                    "hand_type": hand_type,
-                    "value": value,
-                }
-                # print(f"{num} 號玩家 {player.name} 有 {card_list} 類型:{hand_type}")
-                player_hands.append(player_hand)
-        return judge_winner(player_hands)
+        alive_seats = [num for num in range(1, self._player_num + 1)
+                       if self._players[num - 1].status == PlayerStatus.Alive]
+        if alive_seats and all(num in self._hand_states for num in alive_seats):
+            # 以逐街維護的領先座位直接取得贏家，只需為該玩家整理最佳組合
+            if self._leader not in alive_seats:
+                self._update_leader()
+            return self.player_hand(self._leader)
+        return judge_winner(self.player_hands())
+
+    def player_hand(self, num):
+        """
+        整理玩家當前的最佳組合
+        :param num: 座位號碼
+        :return: {"index", "player", "hand", "win_list", "hand_type", "value"}
+        """
+        player = self._players[num - 1]
+        card_list, hand_type, value = self.card_check(num)
+        # print(f"{num} 號玩家 {player.name} 有 {card_list} 類型:{hand_type}")
+        return {
+            "index": num,
+            "player": player,
+            "hand": player.show_hand(),
+            'win_list': card_list,
+            "hand_type": hand_type,
+            "value": value,
+        }
+
+    def player_strength(self, num) -> int:
+        """
+        玩家當前牌力(有逐街狀態時直接取用，不需整理最佳組合)
+        :param num: 座位號碼
+        :return: int
+        """
+        state = self._hand_states.get(num)
+        if state is not None:
+            return state.strength
+        return self.card_check(num)[2]
+
+    def player_stage(self, num) -> int:
+        """
+        玩家當前的牌型階級(對應 CardTypeStageEnum，短牌會換回同花與葫蘆的階級)
+        :param num: 座位號碼
+        :return: int
+        """
+        strength = self.player_strength(num)
+        if self._game_type == GameType.ShortDeck:
+            from PokerShortDeck import short_deck_stage
+
+            return short_deck_stage(strength)
+        return strength >> STAGE_SHIFT
+
+    def player_hands(self):
+        """
+        所有存活玩家當前的最佳組合
+        :return: [{...}, ...]
+        """
+        return [self.player_hand(num) for num in range(1, self._player_num + 1) if self.legal_number_player(num)]
+
+    def judge_player_winners(self):
+        """
+        根據當前情況 判斷所有並列的贏家(平分底池)
+        :return: [{...}, ...]
+        """
+        alive_seats = [num for num in range(1, self._player_num + 1)
+                       if self._players[num - 1].status == PlayerStatus.Alive]
+        if alive_seats and all(num in self._hand_states for num in alive_seats):
+            best_strength = max(self._hand_states[num].strength for num in alive_seats)
+            return [self.player_hand(num) for num in alive_seats if self._hand_states[num].strength == best_strength]
+        return judge_winners(self.player_hands())
+
+    def hand_type_odds(self):
+        """
+        翻牌後各存活玩家到河牌時的牌型機率與 outs(所有玩家共用一次剩餘牌窮舉)
+        :return: [{"index", "player", "hand_type", "distribution", "outs"}, ...]
+        """
+        if self._game_type != GameType.Holdem:
+            raise ValueError(f'牌型機率目前只支援德州撲克，目前為{self._game_type.name}')
+        from PokerOuts import hand_type_odds
+
+        seats = [num for num in range(1, self._player_num + 1)
+                 if self._players[num - 1].status == PlayerStatus.Alive]
+        # 已棄牌、出局玩家的手牌不會再出現，視為死牌
+        dead = [card for player in self._players if player.status != PlayerStatus.Alive
+                for card in player.show_hand(as_class=True) or []]
+        odds = hand_type_odds([self._players[num - 1].show_hand(as_class=True) for num in seats],
+                              self._appear_stack.content(as_class=True) or [], dead)
+        results = []
+        for num, player_odds in zip(seats, odds):
+            results.append({
+                "index": num,
+                "player": self._players[num - 1],
+                "hand_type": player_odds["hand_type"],
+                "distribution": player_odds["distribution"],
+                "outs": [card_of_code(code).img for code in player_odds["outs"]],
+            })
+        return results
 
 
 if __name__ == '__main__':
     def one_game():
-        # 牌局設定
+        # 牌局設定(重複使用同一個牌局)
         win_list = []
-        game = ClassicPokerGame(_players=players)
+        game.reset()
         # 遊戲開始
         game.game_start()
         # sleep(1)
@@ -235,6 +422,7 @@ if __name__ == '__main__':
     players = []
     for time in range(1, PLAYER_NUM + 1):
         players.append(Player(f'Player_{time}'))
+    game = ClassicPokerGame(_players=players)
 
     total_list = []
     always_win_list = []
@@ -0,0 +1,265 @@
+"""
+牌型判斷、牌力評估與勝率計算的單元測試(pytest)
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import textwrap
+from collections import Counter
+from itertools import combinations
+
+import pytest
+
+from PokerEquity import exhaustive_equity, monte_carlo_equity, prepare_cards
+from PokerEvaluator import STAGE_ROYAL_FLUSH, STAGE_STRAIGHT_FLUSH, STAGE_FOUR_KIND, STAGE_FULL_HOUSE, STAGE_FLUSH, \
+    STAGE_STRAIGHT, STAGE_THREE_KIND, STAGE_TWO_PAIR, STAGE_ONE_PAIR, STAGE_HIGH_CARD, STAGE_SHIFT, encode_cards, \
+    evaluate5, evaluate_best
+from PokerOmaha import OmahaHandState, evaluate_omaha, evaluate_omaha_batch, omaha_equity
+from PokerShortDeck import SHORT_DECK_CODES, ShortDeckHandState, evaluate_short_deck, short_deck_equity, \
+    short_deck_stage
+from PokerRunner import run_games
+from TexasHoldem import CardTypeEnum, TexasRule, judge_winner, judge_winners
+
+# 由小到大的各牌型代表(A-2-3-4-5 為最小的順子)
+HANDS_BY_TYPE = [
+    (CardTypeEnum.HighCard, ['p1', 'h12', 'c9', 't5', 'p3']),
+    (CardTypeEnum.OnePair, ['p1', 'h1', 'c9', 't5', 'p2']),
+    (CardTypeEnum.TwoPair, ['p13', 'h13', 'c4', 't4', 'p2']),
+    (CardTypeEnum.ThreeKind, ['p9', 'h9', 'c9', 't4', 'p2']),
+    (CardTypeEnum.Straight, ['p5', 'h4', 'c3', 't2', 'p1']),
+    (CardTypeEnum.Flush, ['c1', 'c11', 'c8', 'c5', 'c2']),
+    (CardTypeEnum.FullHouse, ['p3', 'h3', 'c3', 't2', 'p2']),
+    (CardTypeEnum.FourKind, ['p7', 'h7', 'c7', 't7', 'p2']),
+    (CardTypeEnum.StraightFlush, ['h9', 'h8', 'h7', 'h6', 'h5']),
+    (CardTypeEnum.RoyalFlush, ['p1', 'p13', 'p12', 'p11', 'p10']),
+]
+
+
+def _hand(index, card_list):
+    return {"index": index, "value": TexasRule(card_list).check[1]}
+
+
+def test_check_category_ordering():
+    strengths = []
+    for card_type, card_list in HANDS_BY_TYPE:
+        hand_type, strength = TexasRule(card_list).check
+        assert hand_type == card_type.value
+        strengths.append(strength)
+    assert strengths == sorted(strengths)
+    assert len(set(strengths)) == len(strengths)
+
+
+@pytest.mark.parametrize('stronger, weaker', [
+    (['p1', 'h1', 'c13', 't5', 'p2'], ['c1', 't1', 'p12', 'h11', 'c10']),
+    (['p13', 'h13', 'c4', 't4', 'p3'], ['c13', 't13', 'p4', 'h4', 'c2']),
+    (['p6', 'h5', 'c4', 't3', 'p2'], ['p5', 'h4', 'c3', 't2', 'p1']),
+    (['c1', 'c11', 'c8', 'c5', 'c3'], ['h1', 'h11', 'h8', 'h5', 'h2']),
+    (['p4', 'h4', 'c4', 't2', 'p2'], ['p3', 'h3', 'c3', 't1', 'p1']),
+])
+def test_check_kicker_ordering(stronger, weaker):
+    assert TexasRule(stronger).check[1] > TexasRule(weaker).check[1]
+
+
+def test_check_uses_best_five_of_seven():
+    hand_type, strength = TexasRule(['p1', 'h1', 'p13', 'p12', 'p11', 'p10', 'c2']).check
+    assert hand_type == CardTypeEnum.RoyalFlush.value
+    assert strength == TexasRule(['p1', 'p13', 'p12', 'p11', 'p10']).check[1]
+
+
+def test_judge_winners_ties():
+    hands = [
+        _hand(1, ['p1', 'h13', 'c9', 't5', 'p3']),
+        _hand(2, ['h1', 'c13', 't9', 'p5', 'h3']),
+        _hand(3, ['c1', 't13', 'p9', 'h5', 'c2']),
+    ]
+    assert [hand["index"] for hand in judge_winners(hands)] == [1, 2]
+    assert judge_winner(hands)["index"] == 1
+    assert judge_winners([]) == []
+    assert judge_winner([]) == {}
+
+
+def test_judge_winners_board_plays():
+    board = ['p1', 'p13', 'p12', 'p11', 'p10']
+    hands = [_hand(1, ['h2', 'c3'] + board), _hand(2, ['t1', 'h13'] + board)]
+    assert [hand["index"] for hand in judge_winners(hands)] == [1, 2]
+
+
+def test_evaluate_best_matches_evaluate5():
+    mismatches = [codes for codes in combinations(range(52), 5) if evaluate_best(codes)[1] != evaluate5(*codes)]
+    assert mismatches == []
+
+
+def test_evaluate_batch_matches_evaluate5():
+    pytest.importorskip('numpy')
+    from PokerBatch import verify_all_five_card_hands
+
+    assert verify_all_five_card_hands() == 0
+
+
+def test_exhaustive_equity_matches_brute_force_on_turn():
+    # 前兩位玩家同點數，河牌有獨贏也有平分
+    hands = [['p1', 'h13'], ['c1', 't13'], ['p10', 'p9']]
+    board = ['p8', 'h12', 'c2', 't7']
+    hand_codes, board_codes, remaining = prepare_cards(hands, board)
+    player_num = len(hands)
+    wins, ties, shares = [0] * player_num, [0] * player_num, [0.0] * player_num
+    for river in remaining:
+        cards = board_codes + [river]
+        strengths = [max(evaluate5(*codes) for codes in combinations(hand + cards, 5)) for hand in hand_codes]
+        winners = [index for index in range(player_num) if strengths[index] == max(strengths)]
+        for index in winners:
+            if len(winners) == 1:
+                wins[index] += 1
+            else:
+                ties[index] += 1
+            shares[index] += 1 / len(winners)
+    results = exhaustive_equity(hands, board)
+    for index, result in enumerate(results):
+        assert result["win"] == pytest.approx(wins[index] / len(remaining))
+        assert result["tie"] == pytest.approx(ties[index] / len(remaining))
+        assert result["equity"] == pytest.approx(shares[index] / len(remaining))
+    assert sum(result["equity"] for result in results) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize('equity, hands', [
+    (monte_carlo_equity, [['p1', 'h1'], ['c13', 't12']]),
+    (omaha_equity, [['p1', 'h1', 'c13', 't12'], ['p10', 'h9', 'c8', 't7']]),
+    (short_deck_equity, [['p1', 'h1'], ['c13', 't12']]),
+])
+@pytest.mark.parametrize('trials', [0, -1])
+def test_equity_rejects_non_positive_trials(equity, hands, trials):
+    with pytest.raises(ValueError, match='模擬次數'):
+        equity(hands, trials=trials)
+
+
+def _omaha_brute_force(hole, board):
+    return max(evaluate5(*pair, *triple) for pair in combinations(hole, 2) for triple in combinations(board, 3))
+
+
+def test_omaha_matches_brute_force():
+    rng = random.Random(23)
+    # 一半牌局只用兩種花色，讓「顯牌四張同花、手牌只能用兩張」的情形經常出現
+    decks = [list(range(52)), [code for code in range(52) if code & 3 < 2]]
+    deals = [rng.sample(decks[index % 2], 9) for index in range(2000)]
+    for deal in deals:
+        hole, board = deal[:4], deal[4:]
+        state = OmahaHandState(hole, board[:3])
+        assert state.strength == evaluate_omaha(hole, board[:3]) == _omaha_brute_force(hole, board[:3])
+        assert state.add(board[3:4]) == evaluate_omaha(hole, board[:4]) == _omaha_brute_force(hole, board[:4])
+        assert state.add(board[4:]) == evaluate_omaha(hole, board) == _omaha_brute_force(hole, board)
+
+    np = pytest.importorskip('numpy')
+    holes = np.array([deal[:4] for deal in deals])
+    for board_num in (3, 4, 5):
+        strength, stage = evaluate_omaha_batch(holes, np.array([deal[4:4 + board_num] for deal in deals]))
+        expected = [_omaha_brute_force(deal[:4], deal[4:4 + board_num]) for deal in deals]
+        assert strength.tolist() == expected
+        assert stage.tolist() == [value >> STAGE_SHIFT for value in expected]
+
+
+def _short_deck_reference(codes):
+    """
+    不使用查表的短牌五張評估(同花大於葫蘆，A-6-7-8-9 為最小的順子)
+    :return: (可比較大小的鍵, 牌型階級)
+    """
+    ranks = [(code >> 2) + 2 for code in codes]
+    groups = sorted(((count, rank) for rank, count in Counter(ranks).items()), reverse=True)
+    counts = [count for count, _ in groups]
+    ordered = tuple(rank for _, rank in groups)
+    flush = len({code & 3 for code in codes}) == 1
+    high = 0
+    if len(groups) == 5:
+        if ordered[0] - ordered[4] == 4:
+            high = ordered[0]
+        elif set(ordered) == {14, 9, 8, 7, 6}:
+            high = 9
+    if flush and high:
+        return (8, (high,)), STAGE_ROYAL_FLUSH if high == 14 else STAGE_STRAIGHT_FLUSH
+    if counts[0] == 4:
+        return (7, ordered), STAGE_FOUR_KIND
+    if flush:
+        return (6, ordered), STAGE_FLUSH
+    if counts[:2] == [3, 2]:
+        return (5, ordered), STAGE_FULL_HOUSE
+    if high:
+        return (4, (high,)), STAGE_STRAIGHT
+    if counts[0] == 3:
+        return (3, ordered), STAGE_THREE_KIND
+    if counts[:2] == [2, 2]:
+        return (2, ordered), STAGE_TWO_PAIR
+    if counts[0] == 2:
+        return (1, ordered), STAGE_ONE_PAIR
+    return (0, ordered), STAGE_HIGH_CARD
+
+
+def test_short_deck_wheel_is_lowest_straight():
+    wheel = evaluate_short_deck(encode_cards(['p1', 'h6', 'c7', 't8', 'p9']))
+    six_high = evaluate_short_deck(encode_cards(['p6', 'h7', 'c8', 't9', 'p10']))
+    trips = evaluate_short_deck(encode_cards(['p1', 'h1', 'c1', 't13', 'p12']))
+    assert short_deck_stage(wheel) == STAGE_STRAIGHT
+    assert trips < wheel < six_high
+
+
+def test_short_deck_flush_beats_full_house():
+    flush = evaluate_short_deck(encode_cards(['c1', 'c11', 'c8', 'c7', 'c6']))
+    full_house = evaluate_short_deck(encode_cards(['p1', 'h1', 'c1', 't13', 'p13']))
+    four_kind = evaluate_short_deck(encode_cards(['p6', 'h6', 'c6', 't6', 'p7']))
+    assert short_deck_stage(flush) == STAGE_FLUSH
+    assert short_deck_stage(full_house) == STAGE_FULL_HOUSE
+    assert full_house < flush < four_kind
+
+
+def test_short_deck_matches_reference():
+    rng = random.Random(24)
+    # 一半牌局只用兩種花色，讓同花經常出現
+    decks = [list(SHORT_DECK_CODES), [code for code in SHORT_DECK_CODES if code & 3 < 2]]
+    pairs = set()
+    for index in range(2000):
+        deal = rng.sample(decks[index % 2], 7)
+        best_key, best_stage = max(_short_deck_reference(codes) for codes in combinations(deal, 5))
+        strength = evaluate_short_deck(deal)
+        assert short_deck_stage(strength) == best_stage
+        pairs.add((strength, best_key))
+        state = ShortDeckHandState(deal[:2])
+        assert state.add(deal[2:5]) == evaluate_short_deck(deal[:5])
+        assert state.add(deal[5:6]) == evaluate_short_deck(deal[:6])
+        assert state.add(deal[6:]) == strength
+    # 牌力與參考鍵一一對應且大小順序相同
+    assert len({strength for strength, _ in pairs}) == len({key for _, key in pairs}) == len(pairs)
+    keys = [key for _, key in sorted(pairs)]
+    assert keys == sorted(keys)
+
+
+def test_run_games_independent_of_worker_count():
+    # 小分片讓 3 個工作行程都分到牌局
+    serial = run_games(600, player_num=6, seed=7, workers=1, shard_size=100)
+    parallel = run_games(600, player_num=6, seed=7, workers=3, shard_size=100)
+    assert serial.games == 600
+    assert serial == parallel
+
+
+def test_spawn_workers_map_shared_tables(tmp_path):
+    # 主程式模組在最上層 import 評估模組(spawn 工作行程會先重新執行這些 import)
+    script = tmp_path / 'spawn_pool.py'
+    script.write_text(textwrap.dedent("""
+        import json
+        import os
+
+        import PokerRunner
+        from PokerSharedTables import SHARED_TABLES_ENV, shared_process_pool, worker_table_types
+
+        if __name__ == '__main__':
+            with shared_process_pool(2) as pool:
+                types = list(pool.map(worker_table_types, range(2)))
+            print(json.dumps({'types': types, 'parent_env': os.environ.get(SHARED_TABLES_ENV)}))
+    """))
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=source_dir)
+    env.pop('POKER_SHARED_TABLES', None)
+    output = subprocess.run([sys.executable, str(script)], env=env, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.splitlines()[-1])
+    assert result['parent_env'] is None
+    for types in result['types']:
+        assert set(types.values()) == {'memoryview'}